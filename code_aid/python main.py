@@ -1,44 +1,103 @@
+import sys
+from utils.profiling import StartupProfiler
+
+# Фазы запуска замеряются с самого начала, до остальных импортов
+STARTUP = StartupProfiler.from_argv()
+
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, font
 import pyperclip
 import json
 import os
-import sys
-import subprocess
-import tempfile
 import random
 from datetime import datetime
 
+STARTUP.mark("import tkinter, pyperclip")
+
 # Добавляем пути к модулям
 sys.path.append(os.path.join(os.path.dirname(__file__), 'snippets'))
 sys.path.append(os.path.join(os.path.dirname(__file__), 'warmups'))
 
-# Импортируем данные
-from snippets.python_snippets import python_snippets
-from snippets.java_snippets import java_snippets
-from snippets.cpp_snippets import cpp_snippets
-from snippets.csharp_snippets import csharp_snippets
-
-from warmups.python_warmups import python_warmups
-from warmups.java_warmups import java_warmups
-from warmups.cpp_warmups import cpp_warmups
-from warmups.csharp_warmups import csharp_warmups
-
-# Собираем все данные в словари
-ALL_SNIPPETS = {
-    "Python": python_snippets,
-    "Java": java_snippets,
-    "C++": cpp_snippets,
-    "C#": csharp_snippets
+from utils.search_engine import SearchEngine, MODE_SUBSTRING, MODE_FUZZY, MODE_TAGS
+from utils.search_db import SearchDatabase
+from utils.textnorm import fold
+from utils.scheduling import Debouncer, BackgroundExecutor
+from utils.highlighter import CodeHighlighter, HighlightCache
+from utils.corpus import LazyCorpus, find_data_files
+from utils.bundle import CorpusBundle
+from utils.runner import PythonWorkerPool, start_python_run, STDERR
+from utils.toolchains import CompileCache, TOOLCHAIN_HINTS
+from utils.run_cache import RunResultCache, CachedRun, RecordedRun, is_deterministic, run_key
+from utils.validation import parse_validate_args, run_validation
+
+STARTUP.mark("import utils")
+
+# Модули с примерами для каждого языка
+SNIPPET_MODULES = {
+    "Python": "snippets.python_snippets",
+    "Java": "snippets.java_snippets",
+    "C++": "snippets.cpp_snippets",
+    "C#": "snippets.csharp_snippets"
 }
 
-ALL_WARMUPS = {
-    "Python": python_warmups,
-    "Java": java_warmups,
-    "C++": cpp_warmups,
-    "C#": csharp_warmups
+# Модули с вопросами разогрева для каждого языка
+WARMUP_MODULES = {
+    "Python": "warmups.python_warmups",
+    "Java": "warmups.java_warmups",
+    "C++": "warmups.cpp_warmups",
+    "C#": "warmups.csharp_warmups"
 }
 
+# Темы и число примеров по источникам - чтобы не импортировать все языки при запуске
+CORPUS_MANIFEST_FILE = "corpus_manifest.json"
+
+# Внешние корпуса в формате JSON Lines дополняют встроенные модули
+CORPORA_DIR = os.path.join(os.path.dirname(__file__), 'corpora')
+
+# Кэш корпуса: сборка встроенных модулей и код примеров из внешних корпусов
+CORPUS_CACHE_DIR = "corpus_cache"
+# Собранные примеры Java, C++ и C#
+COMPILE_CACHE_DIR = "compile_cache"
+# Через сколько мс повторить запуск, пока инструменты языка ищутся в фоне
+TOOLCHAIN_PROBE_RETRY = 200
+
+# Встроенные модули собираются в один файл при первом запуске и после их изменения
+CORPUS_BUNDLE = CorpusBundle.open_or_build(
+    CORPUS_CACHE_DIR, list(SNIPPET_MODULES.values()) + list(WARMUP_MODULES.values()))
+STARTUP.mark("corpus bundle")
+
+# Язык загружается при первом обращении к нему
+ALL_SNIPPETS = LazyCorpus(SNIPPET_MODULES, CORPUS_MANIFEST_FILE,
+                          find_data_files(os.path.join(CORPORA_DIR, 'snippets')),
+                          CORPUS_CACHE_DIR, CORPUS_BUNDLE)
+ALL_WARMUPS = LazyCorpus(WARMUP_MODULES, CORPUS_MANIFEST_FILE,
+                         find_data_files(os.path.join(CORPORA_DIR, 'warmups')),
+                         bundle=CORPUS_BUNDLE)
+STARTUP.mark("corpus manifest")
+
+# Сколько лучших результатов поиска показывать в списке
+SEARCH_RESULT_LIMIT = 500
+
+# Режимы поиска: подпись в интерфейсе -> режим поискового движка
+SEARCH_MODES = {
+    "Подстрока": MODE_SUBSTRING,
+    "С опечатками": MODE_FUZZY,
+    "Теги": MODE_TAGS
+}
+
+# Сколько вопросов разогрева брать из поиска
+WARMUP_SEARCH_LIMIT = 10
+
+# Поисковая база хранится рядом с settings.json
+SEARCH_DB_FILE = "search_index.db"
+
+# Как часто окно вывода забирает новый вывод запущенного кода, мс
+RUN_POLL_INTERVAL = 30
+
+# Кэш подсветки примеров между запусками
+HIGHLIGHT_CACHE_FILE = "highlight_cache.json"
+RUN_CACHE_FILE = "run_cache.json"
+
 
 class CodeAidApp:
     def __init__(self, root):
@@ -55,11 +114,14 @@ class CodeAidApp:
         
         # Загрузка настроек
         self.settings = self.load_settings()
+        STARTUP.mark("load_settings")
         
         # Переменные для состояния
         self.lang_var = tk.StringVar()
         self.topic_var = tk.StringVar()
         self.search_var = tk.StringVar()
+        self.search_mode_var = tk.StringVar(value="Подстрока")
+        self.global_search_var = tk.BooleanVar(value=False)
         self.font_size_var = tk.IntVar(value=self.settings.get('font_size', 11))
         self.dark_mode_var = tk.BooleanVar(value=self.settings.get('dark_mode', False))
         
@@ -67,6 +129,49 @@ class CodeAidApp:
         self.snippets_data = ALL_SNIPPETS
         self.warmups_data = ALL_WARMUPS
         
+        # Поисковая база на диске обновляется только для изменённых языков
+        self.search_db = SearchDatabase.open(SEARCH_DB_FILE)
+        if self.search_db:
+            self.search_db.sync(
+                (lang, sources, lambda lang=lang: self.snippets_data[lang])
+                for lang, sources in self.snippets_data.sources.items())
+        self.search_engine = SearchEngine(self.snippets_data,
+                                          self.settings.get('search_weights'),
+                                          self.search_db)
+        self.warmup_search_engine = SearchEngine.for_warmups(self.warmups_data)
+        STARTUP.mark("search index sync")
+        
+        # Готовая подсветка недавно показанных примеров
+        self.highlight_cache = HighlightCache()
+        self.highlight_cache.load(HIGHLIGHT_CACHE_FILE)
+        STARTUP.mark("highlight cache")
+        
+        # Примеры, показанные в списке: (язык, тема, номер) для каждой строки
+        self.visible_examples = []
+        
+        # Последний поиск: ((режим, область), запрос, найденные документы)
+        self.last_search = None
+        # Выполняемый поиск, результаты которого приходят по частям
+        self.search_state = None
+        self.search_debouncer = Debouncer(self.root, 500, self.on_search)
+        
+        # Поиск выполняется в фоновом потоке, чтобы не блокировать интерфейс
+        self.search_executor = BackgroundExecutor(self.root, name="search-worker",
+                                                  on_error=self.on_search_error)
+        
+        # Заранее запущенные интерпретаторы для быстрого запуска кода
+        self.python_pool = PythonWorkerPool()
+        self.compile_cache = CompileCache(COMPILE_CACHE_DIR)
+        # Отложенный повтор запуска, пока ищутся инструменты языка
+        self.run_retry_id = None
+        # Результаты запуска детерминированных примеров
+        self.run_cache = RunResultCache()
+        self.run_cache.load(RUN_CACHE_FILE)
+        # Показанный пример и его язык (в глобальном поиске язык примера
+        # может не совпадать с выбранным в списке языков)
+        self.current_snippet = None
+        self.current_lang = None
+        
         # История и избранное
         self.history = []
         self.history_index = -1
@@ -80,10 +185,13 @@ class CodeAidApp:
         
         # Создание интерфейса
         self.setup_styles()
+        STARTUP.mark("setup_styles")
         self.create_widgets()
+        STARTUP.mark("create_widgets")
         
         # Заполнение данных
         self.update_lang_combo()
+        STARTUP.mark("update_lang_combo")
         
         # Установка обработчиков
         self.setup_event_handlers()
@@ -91,9 +199,14 @@ class CodeAidApp:
         
         # Загрузка первого примера
         self.load_first_example()
-        
-        # Запуск приветствия
-        self.root.after(1000, self.show_welcome_message)
+        STARTUP.mark("load_first_example")
+        
+        # Запуск приветствия (при профилировании запуска не мешает замеру)
+        if not STARTUP.enabled:
+            self.root.after(1000, self.show_welcome_message)
+            # Интерпретаторы запускаются в фоне, когда окно уже показано
+            self.root.after(1000, self.python_pool.warm_up)
+            self.root.after(1000, self.compile_cache.warm_up)
 
     def setup_styles(self):
         """Настройка стилей элементов интерфейса"""
@@ -209,10 +322,23 @@ class CodeAidApp:
         self.search_entry.pack(side='left', fill='x', expand=True)
         
         ttk.Button(search_container, text="🔍", width=3,
-                  command=self.on_search).pack(side='left', padx=(5, 2))
+                  command=self.search_debouncer.flush).pack(side='left', padx=(5, 2))
         ttk.Button(search_container, text="✖", width=3,
                   command=self.clear_search).pack(side='left')
         
+        self.search_mode_combo = ttk.Combobox(search_container,
+            textvariable=self.search_mode_var,
+            values=list(SEARCH_MODES),
+            state='readonly',
+            width=13,
+            font=('Segoe UI', 10))
+        self.search_mode_combo.pack(side='left', padx=(5, 0))
+        
+        ttk.Checkbutton(search_container,
+            text="Везде",
+            variable=self.global_search_var,
+            command=self.search_debouncer.flush).pack(side='left', padx=(5, 0))
+        
         # Кнопки действий
         action_frame = ttk.Frame(row2)
         action_frame.pack(side='right', padx=(20, 0))
@@ -311,6 +437,7 @@ class CodeAidApp:
         
         # Настройка тегов для подсветки
         self.setup_syntax_highlighting()
+        self.code_highlighter = CodeHighlighter(self.code_text, self.highlight_cache)
         
         # Вкладка с объяснением
         explanation_tab = ttk.Frame(self.notebook)
@@ -366,6 +493,20 @@ class CodeAidApp:
             font=('Segoe UI', 16, 'bold'),
             foreground=self.accent_color).pack(pady=(0, 20))
         
+        # Поиск вопросов по всем языкам
+        search_row = ttk.Frame(warmup_container)
+        search_row.pack(fill='x', pady=(0, 15))
+        
+        ttk.Label(search_row, text="Найти вопросы:").pack(side='left')
+        self.warmup_search_var = tk.StringVar()
+        warmup_entry = ttk.Entry(search_row,
+            textvariable=self.warmup_search_var,
+            font=('Segoe UI', 10))
+        warmup_entry.pack(side='left', fill='x', expand=True, padx=5)
+        warmup_entry.bind('<Return>', lambda e: self.search_warmups())
+        ttk.Button(search_row, text="🔍 Разогрев по запросу",
+                  command=self.search_warmups).pack(side='left')
+        
         # Область для вопросов
         self.warmup_frame = ttk.Frame(warmup_container)
         self.warmup_frame.pack(fill='both', expand=True)
@@ -389,7 +530,8 @@ class CodeAidApp:
         """Настройка обработчиков событий"""
         self.lang_var.trace('w', self.on_lang_changed)
         self.topic_var.trace('w', self.on_topic_changed)
-        self.search_var.trace('w', lambda *args: self.root.after(500, self.on_search))
+        self.search_var.trace('w', self.search_debouncer.trigger)
+        self.search_mode_var.trace('w', lambda *args: self.search_debouncer.flush())
         self.examples_listbox.bind('<<ListboxSelect>>', self.on_example_selected)
         self.font_size_var.trace('w', lambda *args: self.update_font_size())
         
@@ -406,6 +548,7 @@ class CodeAidApp:
             ('<Control-s>', self.save_code_to_file),
             ('<Control-f>', lambda e: self.search_entry.focus()),
             ('<Control-r>', self.run_code),
+            ('<Control-R>', self.rerun_code),
             ('<Control-w>', self.start_warmup),
             ('<F1>', self.show_help),
             ('<F5>', self.refresh_data),
@@ -446,7 +589,7 @@ class CodeAidApp:
         else:
             self.topic_combo['values'] = []
             self.topic_var.set('')
-            self.examples_listbox.delete(0, tk.END)
+            self.show_examples([])
         self.update_stats()
 
     def on_topic_changed(self, *args):
@@ -454,15 +597,14 @@ class CodeAidApp:
         lang = self.lang_var.get()
         topic = self.topic_var.get()
         
-        self.examples_listbox.delete(0, tk.END)
+        # Результат поиска по прошлой теме больше не нужен
+        self.search_executor.cancel()
         
+        keys = []
         if lang in self.snippets_data and topic in self.snippets_data[lang]:
-            for snippet in self.snippets_data[lang][topic]:
-                self.examples_listbox.insert(tk.END, snippet['title'])
-            
-            if self.examples_listbox.size() > 0:
-                self.examples_listbox.selection_set(0)
-                self.on_example_selected(None)
+            keys = [(lang, topic, idx) for idx in range(len(self.snippets_data[lang][topic]))]
+        
+        self.show_examples(keys)
         
         self.update_status(f"Тема: {topic}")
         self.update_stats()
@@ -473,12 +615,16 @@ class CodeAidApp:
         if not selection:
             return
             
-        idx = selection[0]
-        lang = self.lang_var.get()
-        topic = self.topic_var.get()
+        key = self.visible_examples[selection[0]]
+        if key is None:
+            # Заголовок группы в глобальном поиске
+            return
+        lang, topic, idx = key
         
         if lang in self.snippets_data and topic in self.snippets_data[lang]:
             snippet = self.snippets_data[lang][topic][idx]
+            self.current_snippet = snippet
+            self.current_lang = lang
             
             # Добавляем в историю
             self.add_to_history(lang, topic, idx)
@@ -506,118 +652,123 @@ class CodeAidApp:
 
     def apply_syntax_highlighting(self, lang):
         """Применяет подсветку синтаксиса для выбранного языка"""
-        # Базовая реализация - можно расширить
-        if lang == "Python":
-            self.highlight_python()
-        elif lang == "Java":
-            self.highlight_java()
-        elif lang == "C++":
-            self.highlight_cpp()
-        elif lang == "C#":
-            self.highlight_csharp()
-
-    def highlight_python(self):
-        """Подсветка синтаксиса Python"""
-        keywords = [
-            'def', 'class', 'if', 'elif', 'else', 'for', 'while',
-            'try', 'except', 'finally', 'with', 'import', 'from',
-            'as', 'return', 'yield', 'async', 'await', 'lambda'
-        ]
-        
-        self.highlight_keywords(keywords, 'keyword')
+        # Большой код лексируется в фоне, теги выставляются порциями
+        code = self.code_text.get(1.0, 'end-1c')
+        self.code_highlighter.highlight(lang, code)
 
-    def highlight_java(self):
-        """Подсветка синтаксиса Java"""
-        keywords = [
-            'public', 'private', 'protected', 'class', 'interface',
-            'extends', 'implements', 'void', 'int', 'String', 'boolean',
-            'if', 'else', 'for', 'while', 'try', 'catch', 'finally',
-            'return', 'new', 'static', 'final'
-        ]
-        
-        self.highlight_keywords(keywords, 'keyword')
+    def show_examples(self, keys):
+        """Заполняет список примеров по ключам (язык, тема, номер)"""
+        self.visible_examples = []
+        self.examples_listbox.delete(0, tk.END)
+        self.append_examples(keys)
 
-    def highlight_cpp(self):
-        """Подсветка синтаксиса C++"""
-        keywords = [
-            'int', 'float', 'double', 'char', 'void', 'bool',
-            'if', 'else', 'for', 'while', 'do', 'switch', 'case',
-            'class', 'struct', 'public', 'private', 'protected',
-            'virtual', 'override', 'template', 'typename', 'namespace',
-            'return', 'new', 'delete', 'const', 'static'
-        ]
-        
-        self.highlight_keywords(keywords, 'keyword')
-
-    def highlight_csharp(self):
-        """Подсветка синтаксиса C#"""
-        keywords = [
-            'public', 'private', 'protected', 'internal', 'class',
-            'interface', 'namespace', 'using', 'var', 'void', 'int',
-            'string', 'bool', 'if', 'else', 'for', 'foreach', 'while',
-            'switch', 'case', 'break', 'continue', 'return', 'new',
-            'this', 'base', 'virtual', 'override', 'async', 'await',
-            'try', 'catch', 'finally', 'throw'
-        ]
-        
-        self.highlight_keywords(keywords, 'keyword')
-
-    def highlight_keywords(self, keywords, tag):
-        """Подсветка ключевых слов"""
-        code = self.code_text.get(1.0, tk.END)
-        
-        for keyword in keywords:
-            start_pos = '1.0'
-            while True:
-                start_pos = self.code_text.search(
-                    r'\b' + keyword + r'\b',
-                    start_pos,
-                    stopindex=tk.END,
-                    regexp=True
-                )
-                if not start_pos:
-                    break
-                end_pos = f"{start_pos}+{len(keyword)}c"
-                self.code_text.tag_add(tag, start_pos, end_pos)
-                start_pos = end_pos
+    def append_examples(self, keys, header=None):
+        """Добавляет примеры в конец списка; header - строка заголовка группы"""
+        had_examples = any(key is not None for key in self.visible_examples)
+        
+        if header:
+            self.visible_examples.append(None)
+            self.examples_listbox.insert(tk.END, header)
+            self.examples_listbox.itemconfig(tk.END, fg=self.accent_color)
+        
+        for lang, topic, idx in keys:
+            self.visible_examples.append((lang, topic, idx))
+            self.examples_listbox.insert(tk.END, self.snippets_data[lang][topic][idx]['title'])
+        
+        # Первый найденный пример открываем сразу
+        if not had_examples and keys:
+            first_row = len(self.visible_examples) - len(keys)
+            self.examples_listbox.selection_clear(0, tk.END)
+            self.examples_listbox.selection_set(first_row)
+            self.on_example_selected(None)
 
     def on_search(self, *args):
         """Фильтрует примеры по ключевому слову"""
-        query = self.search_var.get().lower().strip()
+        query = fold(self.search_var.get().strip())
+        mode = SEARCH_MODES.get(self.search_mode_var.get(), MODE_SUBSTRING)
         lang = self.lang_var.get()
         topic = self.topic_var.get()
         
-        self.examples_listbox.delete(0, tk.END)
-        
-        if not lang or not topic or lang not in self.snippets_data or topic not in self.snippets_data[lang]:
+        if self.global_search_var.get():
+            # Глобальный поиск идёт по всем языкам и темам одного индекса
+            scopes = self.search_engine.scopes()
+            search_key = (mode, None)
+        elif not lang or not topic or lang not in self.snippets_data or topic not in self.snippets_data[lang]:
+            self.search_executor.cancel()
+            self.last_search = None
+            self.show_examples([])
             return
-            
-        examples = self.snippets_data[lang][topic]
-        
-        if not query:
-            for snippet in examples:
-                self.examples_listbox.insert(tk.END, snippet['title'])
         else:
-            found_examples = []
-            for snippet in examples:
-                search_fields = [
-                    snippet['title'].lower(),
-                    snippet['code'].lower(),
-                    snippet['explanation'].lower(),
-                    snippet['use_case'].lower()
-                ]
-                
-                if any(query in field for field in search_fields):
-                    found_examples.append(snippet['title'])
-            
-            for title in found_examples:
-                self.examples_listbox.insert(tk.END, title)
-        
-        if self.examples_listbox.size() > 0:
-            self.examples_listbox.selection_set(0)
-            self.on_example_selected(None)
-        
-        self.update_status(f"Найдено: {self.examples_listbox.size()} примеров")
+            scopes = [(lang, topic)]
+            search_key = (mode, (lang, topic))
+        
+        # Если запрос только дополнил предыдущий, уточняем прошлую выдачу
+        candidates = None
+        if self.last_search and mode == MODE_SUBSTRING:
+            last_key, last_query, last_found = self.last_search
+            if last_key == search_key and last_query and query.startswith(last_query):
+                candidates = last_found
+        
+        self.search_state = {
+            'key': search_key,
+            'query': query,
+            'grouped': len(scopes) > 1,
+            'started': False,
+            'found': [],
+            'count': 0,
+            'shown': 0,
+            'error': None
+        }
+        self.search_executor.submit_stream(self.run_search, self.show_search_batch,
+                                           self.finish_search, query, mode, scopes, candidates)
+
+    def run_search(self, query, mode, scopes, candidates):
+        """Ищет по областям и выдаёт результаты по мере готовности (в фоновом потоке)"""
+        return self.search_engine.search_scopes(query, mode, scopes, candidates,
+                                                SEARCH_RESULT_LIMIT)
+
+    def show_search_batch(self, batch):
+        """Добавляет в список результаты одной области (в потоке Tk)"""
+        state = self.search_state
+        if not state['started']:
+            state['started'] = True
+            self.show_examples([])
+        
+        state['found'].extend(batch['found'])
+        state['count'] += batch['count']
+        state['shown'] += len(batch['ranked'])
+        state['error'] = batch['error']
+        
+        keys = batch['ranked']
+        if keys:
+            header = None
+            if state['grouped']:
+                lang, topic = batch['scope']
+                header = f"── {lang} / {topic} ──"
+            self.append_examples(keys, header)
+        
+        self.update_status(f"Найдено: {state['count']} примеров...")
+
+    def on_search_error(self, message):
+        """Ошибка поиска в фоновом потоке: итог поиска покажет её (в потоке Tk)"""
+        self.search_state['error'] = f"Ошибка поиска: {message}"
+
+    def finish_search(self):
+        """Завершает поиск: запоминает выдачу и показывает итог (в потоке Tk)"""
+        state = self.search_state
+        if not state['started']:
+            self.show_examples([])
+        
+        # Для уточнения запроса нужны все совпадения, а не только лучшие
+        self.last_search = (state['key'], state['query'], state['found'])
+        
+        count = state['count']
+        if state['error']:
+            self.update_status(state['error'])
+        elif count > state['shown']:
+            self.update_status(f"Найдено: {count} примеров, показаны лучшие {state['shown']}")
+        else:
+            self.update_status(f"Найдено: {count} примеров")
 
     def start_warmup(self):
         """Начинает сессию разогрева"""
@@ -639,13 +790,37 @@ class CodeAidApp:
             return
         
         # Выбираем 3 случайных вопроса
-        selected_questions = random.sample(questions, min(3, len(questions)))
+        selected = random.sample(range(len(questions)), min(3, len(questions)))
+        self.begin_warmup([(lang, topic, idx) for idx in selected])
+
+    def search_warmups(self):
+        """Начинает разогрев по вопросам, найденным во всех языках"""
+        query = self.warmup_search_var.get().strip()
+        if not query:
+            messagebox.showwarning("Предупреждение", "Введите запрос, например: LIFO или стек")
+            return
+        
+        keys = self.find_warmup_questions(query)
+        if not keys:
+            messagebox.showinfo("Информация", f"Вопросы по запросу '{query}' не найдены")
+            return
         
+        self.begin_warmup(keys)
+
+    def find_warmup_questions(self, query):
+        """Ищет вопросы разогрева по индексу; при пустом результате - с опечатками"""
+        for mode in (MODE_SUBSTRING, MODE_FUZZY):
+            batch = self.warmup_search_engine.search(query, mode, None, limit=WARMUP_SEARCH_LIMIT)
+            if batch['ranked']:
+                return batch['ranked']
+        return []
+
+    def begin_warmup(self, keys):
+        """Запускает разогрев по списку вопросов (язык, тема, номер)"""
         # Сохраняем текущий разогрев
         self.current_warmup = {
-            'lang': lang,
-            'topic': topic,
-            'questions': selected_questions,
+            'sources': keys,
+            'questions': [self.warmups_data[lang][topic][idx] for lang, topic, idx in keys],
             'current_question': 0,
             'score': 0
         }
@@ -668,8 +843,9 @@ class CodeAidApp:
         question_data = self.current_warmup['questions'][self.current_warmup['current_question']]
         
         # Вопрос
+        lang, topic, _ = self.current_warmup['sources'][self.current_warmup['current_question']]
         question_text = ttk.Label(self.warmup_frame,
-            text=f"Вопрос {self.current_warmup['current_question'] + 1} из {len(self.current_warmup['questions'])}",
+            text=f"Вопрос {self.current_warmup['current_question'] + 1} из {len(self.current_warmup['questions'])} · {lang} / {topic}",
             font=('Segoe UI', 11, 'bold'))
         question_text.pack(anchor='w', pady=(0, 10))
         
@@ -828,6 +1004,10 @@ class CodeAidApp:
                 pyperclip.copy(code)
                 self.update_status("Код скопирован")
 
+    def code_lang(self):
+        """Язык кода в редакторе - язык показанного примера"""
+        return self.current_lang or self.lang_var.get()
+
     def save_code_to_file(self):
         """Сохраняет текущий код в файл"""
         code = self.code_text.get(1.0, tk.END).strip()
@@ -844,7 +1024,7 @@ class CodeAidApp:
             "C#": ".cs"
         }
         
-        ext = ext_map.get(self.lang_var.get(), ".txt")
+        ext = ext_map.get(self.code_lang(), ".txt")
         
         file_path = filedialog.asksaveasfilename(
             defaultextension=ext,
@@ -866,53 +1046,137 @@ class CodeAidApp:
             except Exception as e:
                 messagebox.showerror("Ошибка", f"Не удалось сохранить: {str(e)}")
 
-    def run_code(self):
-        """Пытается запустить код (только для Python)"""
-        if self.lang_var.get() != "Python":
-            messagebox.showinfo("Запуск кода", 
-                "Автоматический запуск доступен только для Python")
-            return
-            
+    def run_code(self, event=None, force=False):
+        """Запускает код и показывает вывод по мере появления.
+
+        Python выполняется в пуле интерпретаторов, Java, C++ и C#
+        компилируются установленными инструментами (с кешем сборок).
+        Результат детерминированного кода берётся из кеша, если не force.
+        """
+        # Повторные нажатия не копят отложенные запуски - остаётся последний
+        if self.run_retry_id is not None:
+            self.root.after_cancel(self.run_retry_id)
+            self.run_retry_id = None
+        
+        lang = self.code_lang()
         code = self.code_text.get(1.0, tk.END).strip()
         if not code:
             return
-            
-        # Сохраняем во временный файл и запускаем
-        import tempfile
+        
+        if not self.compile_cache.probed(lang):
+            # Компилятор ещё ищется в фоне - повторяем, когда поиск закончится
+            self.compile_cache.warm_up()
+            self.update_status(f"Поиск инструментов {lang}...")
+            self.run_retry_id = self.root.after(TOOLCHAIN_PROBE_RETRY,
+                                                lambda: self.run_code(force=force))
+            return
+        
+        if lang != "Python" and self.compile_cache.toolchain(lang) is None:
+            messagebox.showinfo("Запуск кода", 
+                f"Для запуска {lang} нужен {TOOLCHAIN_HINTS.get(lang, 'компилятор')}")
+            return
+        
+        # Пометка примера учитывается, только если его код не изменён
+        snippet = self.current_snippet
+        if snippet is not None and snippet['code'].strip() != code:
+            snippet = None
+        key = None
+        if is_deterministic(code, snippet):
+            runtime = sys.version if lang == "Python" else self.compile_cache.runtime_id(lang)
+            key = run_key(lang, runtime, code)
+            result = None if force else self.run_cache.get(key)
+            if result is not None:
+                self.show_run_output(CachedRun(result), lambda: self.run_code(force=True))
+                return
         
         try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-                f.write(code)
-                temp_file = f.name
-            
-            # Запускаем Python процесс
-            result = subprocess.run(['python', temp_file], 
-                                  capture_output=True, text=True, timeout=10)
-            
-            # Показываем результат
-            output_window = tk.Toplevel(self.root)
-            output_window.title("Результат выполнения")
-            output_window.geometry("600x400")
-            
-            text = scrolledtext.ScrolledText(output_window)
-            text.pack(fill='both', expand=True, padx=10, pady=10)
-            
-            if result.returncode == 0:
-                text.insert(1.0, "✅ Выполнение успешно\n\n")
-                text.insert(tk.END, result.stdout)
+            if lang != "Python":
+                run = self.compile_cache.start_run(lang, code)
             else:
-                text.insert(1.0, "❌ Ошибка выполнения\n\n")
-                text.insert(tk.END, result.stderr)
+                try:
+                    run = self.python_pool.run(code)
+                except OSError:
+                    # Пул недоступен - запускаем отдельным процессом
+                    run = start_python_run(code)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось запустить код: {str(e)}")
+            return
+        
+        if key is not None:
+            run = RecordedRun(run, self.run_cache, key)
+        self.show_run_output(run)
+
+    def rerun_code(self, event=None):
+        """Запускает код заново, не используя кеш результатов"""
+        self.run_code(force=True)
+
+    def show_run_output(self, run, rerun=None):
+        """Окно вывода запущенного кода с кнопкой остановки.
+
+        Для результата из кеша вместо остановки - кнопка нового запуска.
+        """
+        output_window = tk.Toplevel(self.root)
+        output_window.title("Результат выполнения")
+        output_window.geometry("600x400")
+        
+        toolbar = ttk.Frame(output_window)
+        toolbar.pack(fill='x', padx=10, pady=(10, 0))
+        stop_button = ttk.Button(toolbar, text="⏹ Остановить", command=run.stop)
+        stop_button.pack(side='left')
+        if rerun is not None:
+            def force_rerun():
+                output_window.destroy()
+                rerun()
             
-            text.config(state='disabled')
+            stop_button.config(text="🔄 Запустить заново", command=force_rerun)
+        status_label = ttk.Label(toolbar, text="🔨 Компиляция..." if run.compiling else "⏳ Выполняется...")
+        status_label.pack(side='left', padx=10)
+        
+        text = scrolledtext.ScrolledText(output_window)
+        text.pack(fill='both', expand=True, padx=10, pady=10)
+        text.tag_config(STDERR, foreground='#d16969' if self.dark_mode_var.get() else '#c00000')
+        text.config(state='disabled')
+        
+        def close():
+            # Закрытие окна останавливает процесс
+            run.stop()
+            output_window.destroy()
+        
+        output_window.protocol("WM_DELETE_WINDOW", close)
+        
+        def poll():
+            if not output_window.winfo_exists():
+                return
+            items = run.poll()
+            if items:
+                text.config(state='normal')
+                for kind, chunk in items:
+                    text.insert(tk.END, chunk, kind)
+                text.see(tk.END)
+                text.config(state='disabled')
             
-            # Удаляем временный файл
-            os.unlink(temp_file)
+            if not run.finished:
+                if not run.compiling:
+                    status_label.config(text="⏳ Выполняется...")
+                output_window.after(RUN_POLL_INTERVAL, poll)
+                return
             
-        except subprocess.TimeoutExpired:
-            messagebox.showerror("Ошибка", "Время выполнения истекло")
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось запустить код: {str(e)}")
+            if rerun is None:
+                stop_button.config(state='disabled')
+            if isinstance(run, CachedRun):
+                status_label.config(text=f"⚡ Из кеша (исходный запуск {run.elapsed:.2f} с)")
+            elif run.timed_out:
+                status_label.config(text=f"⌛ Время выполнения истекло ({run.timeout} с)")
+            elif run.stopped:
+                status_label.config(text="⏹ Остановлено")
+            elif run.compile_failed:
+                status_label.config(text=f"❌ Ошибка компиляции (код {run.returncode})")
+            elif run.returncode == 0:
+                status_label.config(text=f"✅ Выполнение успешно ({run.elapsed:.2f} с)")
+            else:
+                status_label.config(text=f"❌ Ошибка выполнения (код {run.returncode})")
+        
+        poll()
 
     def add_to_history(self, lang, topic, idx):
         """Добавляет пример в историю"""
@@ -929,9 +1193,10 @@ class CodeAidApp:
         if not selection:
             return
             
-        idx = selection[0]
-        lang = self.lang_var.get()
-        topic = self.topic_var.get()
+        key = self.visible_examples[selection[0]]
+        if key is None:
+            return
+        lang, topic, idx = key
         
         if lang in self.snippets_data and topic in self.snippets_data[lang]:
             favorite_key = f"{lang}|{topic}|{idx}"
@@ -1031,18 +1296,14 @@ class CodeAidApp:
         total_examples = 0
         if lang in self.snippets_data:
             if topic and topic in self.snippets_data[lang]:
-                total_examples = len(self.snippets_data[lang][topic])
+                total_examples = self.search_engine.count((lang, topic))
             else:
-                for topic_data in self.snippets_data[lang].values():
-                    total_examples += len(topic_data)
+                total_examples = self.search_engine.count((lang,))
         
         self.count_label.config(text=f"Примеров: {total_examples}")
         
         # Общая статистика
-        total_all = 0
-        for lang_data in self.snippets_data.values():
-            for topic_data in lang_data.values():
-                total_all += len(topic_data)
+        total_all = self.search_engine.count()
         
         self.stats_label.config(
             text=f"Всего примеров: {total_all} | Языков: {len(self.snippets_data)}"
@@ -1077,16 +1338,24 @@ class CodeAidApp:
 2. Выберите пример из списка для просмотра
 3. Используйте поиск для быстрого доступа
 
+Поиск:
+• Подстрока - совпадения в заголовке, коде, описании и тегах
+• С опечатками - находит слова с 1-2 ошибками
+• Теги - запросы вида: алгоритмы AND сортировка NOT массивы
+• Флажок "Везде" ищет по всем языкам и темам
+
 Разогрев:
 • Нажмите "Разогрев" для проверки знаний
 • Ответьте на 3 вопроса по текущей теме
+• Или найдите вопросы по запросу (например, LIFO) во всех языках
 • Неправильные ответы выделяются красным
 
 Горячие клавиши:
 Ctrl+C - Копировать код
 Ctrl+S - Сохранить код в файл
 Ctrl+F - Фокус на поиск
-Ctrl+R - Запустить код (Python)
+Ctrl+R - Запустить код
+Ctrl+Shift+R - Запустить заново, без кеша результатов
 Ctrl+W - Начать разогрев
 F1 - Эта справка
 F5 - Обновить данные
@@ -1165,12 +1434,36 @@ F5 - Обновить данные
         """Обработчик закрытия окна"""
         self.save_settings()
         self.save_favorites()
+        self.highlight_cache.save(HIGHLIGHT_CACHE_FILE)
+        self.run_cache.save(RUN_CACHE_FILE)
+        self.python_pool.close()
+        if self.search_db:
+            self.search_db.close()
         self.root.destroy()
 
 
 def main():
+    # Проверка всех примеров без интерфейса
+    if parse_validate_args(sys.argv[1:]).validate:
+        sys.exit(run_validation(ALL_SNIPPETS, CompileCache(COMPILE_CACHE_DIR)))
+    
     root = tk.Tk()
+    STARTUP.mark("tk.Tk()")
     app = CodeAidApp(root)
+    
+    if STARTUP.enabled:
+        def finish_profile():
+            # Первая отрисовка окна - приложение готово к работе
+            root.update_idletasks()
+            STARTUP.mark("first paint")
+            path = STARTUP.finish()
+            if path:
+                print(f"Профиль запуска сохранён: {path}")
+            if STARTUP.exit_after:
+                app.on_closing()
+        
+        root.after(0, finish_profile)
+    
     root.mainloop()
 
 
@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.runner import PythonWorkerPool, start_python_run, STDOUT, STDERR
+
+
+def collect(run, timeout=20):
+    """Дожидается конца запуска; возвращает (stdout, stderr, код завершения)"""
+    output = {STDOUT: [], STDERR: []}
+    deadline = time.monotonic() + timeout
+    while not run.finished:
+        if time.monotonic() > deadline:
+            run.stop()
+            raise AssertionError("запуск не завершился вовремя")
+        for kind, text in run.poll():
+            if kind in output and text:
+                output[kind].append(text)
+        time.sleep(0.01)
+    for kind, text in run.poll():
+        if kind in output and text:
+            output[kind].append(text)
+    return ''.join(output[STDOUT]), ''.join(output[STDERR]), run.returncode
+
+
+class PooledOutputTest(unittest.TestCase):
+    """Вывод в пуле интерпретаторов такой же, как у отдельного процесса"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = PythonWorkerPool(size=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def assertSameOutput(self, code):
+        expected = collect(start_python_run(code))
+        self.assertEqual(collect(self.pool.run(code)), expected)
+        return expected
+
+    def test_print(self):
+        stdout, _, returncode = self.assertSameOutput("print('привет')")
+        self.assertEqual((stdout, returncode), ("привет\n", 0))
+
+    def test_binary_buffer(self):
+        stdout, _, _ = self.assertSameOutput(
+            "import sys\nsys.stdout.buffer.write('байты\\n'.encode('utf-8'))")
+        self.assertEqual(stdout, "байты\n")
+
+    def test_os_system(self):
+        stdout, _, _ = self.assertSameOutput(
+            "import os, sys\nos.system(f'{sys.executable} -c \"print(42)\"')")
+        self.assertEqual(stdout, "42\n")
+
+    def test_subprocess(self):
+        stdout, stderr, _ = self.assertSameOutput(
+            "import subprocess, sys\n"
+            "subprocess.run([sys.executable, '-c', "
+            "'import sys; print(1); print(2, file=sys.stderr)'])")
+        self.assertEqual((stdout, stderr), ("1\n", "2\n"))
+
+    def test_stderr_and_exit_code(self):
+        _, stderr, returncode = self.assertSameOutput(
+            "import sys\nprint('ошибка', file=sys.stderr)\nsys.exit(3)")
+        self.assertEqual((stderr, returncode), ("ошибка\n", 3))
+
+    def test_fileno_and_input(self):
+        stdout, _, _ = self.assertSameOutput(
+            "import os, sys\n"
+            "os.write(sys.stdout.fileno(), b'fd\\n')\n"
+            "try:\n    input()\nexcept EOFError:\n    print('eof')")
+        self.assertEqual(stdout, "fd\neof\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
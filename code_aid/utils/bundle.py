@@ -0,0 +1,107 @@
+import glob
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+
+from .corpus import module_source_path, import_corpus_module, file_hash
+
+# Заголовок файла: сигнатура и длина таблицы смещений
+BUNDLE_MAGIC = b'PAL1'
+HEADER = struct.Struct('<4sI')
+BUNDLE_SUFFIX = '.bundle'
+
+
+def bundle_key(modules):
+    """Ключ сборки: хеши исходных файлов всех модулей"""
+    digest = hashlib.blake2b(digest_size=16)
+    for module_name in modules:
+        path = module_source_path(module_name)
+        digest.update(module_name.encode('utf-8') + b'\0')
+        digest.update((file_hash(path) if path else '-').encode('ascii'))
+    return digest.hexdigest()
+
+
+def write_bundle(path, modules):
+    """Импортирует модули и записывает их данные одним файлом.
+
+    Формат: заголовок, таблица {модуль: (смещение, длина)} в marshal,
+    затем данные каждого модуля в marshal.
+    """
+    chunks = []
+    table = {}
+    offset = 0
+    for module_name in modules:
+        data = marshal.dumps(import_corpus_module(module_name))
+        table[module_name] = (offset, len(data))
+        chunks.append(data)
+        offset += len(data)
+
+    index = marshal.dumps(table)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(HEADER.pack(BUNDLE_MAGIC, len(index)))
+        f.write(index)
+        for data in chunks:
+            f.write(data)
+    os.replace(path + '.tmp', path)
+
+
+class CorpusBundle:
+    """Заранее собранные данные модулей с примерами и вопросами.
+
+    Файл отображается в память, данные модуля распаковываются из marshal
+    при первом обращении к нему - без импорта и выполнения модуля.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_length = HEADER.unpack_from(self._map, 0)
+        if magic != BUNDLE_MAGIC:
+            self._map.close()
+            raise ValueError(f"Неизвестный формат сборки: {path}")
+        self._data_start = HEADER.size + index_length
+        self.table = marshal.loads(self._map[HEADER.size:self._data_start])
+
+    @classmethod
+    def open_or_build(cls, cache_dir, modules):
+        """Открывает сборку для текущих исходников, при необходимости собирает её.
+
+        Возвращает None, если сборку не удалось ни открыть, ни собрать.
+        """
+        modules = list(modules)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            path = os.path.join(cache_dir, f"corpus-{bundle_key(modules)}{BUNDLE_SUFFIX}")
+            if not os.path.exists(path):
+                write_bundle(path, modules)
+                remove_stale_bundles(cache_dir, path)
+            return cls(path)
+        except (OSError, ValueError, ImportError) as e:
+            print(f"Сборка корпуса недоступна: {e}")
+            return None
+
+    def __contains__(self, module_name):
+        return module_name in self.table
+
+    def load(self, module_name):
+        """Данные модуля: словарь тема -> список документов"""
+        offset, length = self.table[module_name]
+        start = self._data_start + offset
+        return marshal.loads(self._map[start:start + length])
+
+    def close(self):
+        self._map.close()
+
+
+def remove_stale_bundles(cache_dir, current):
+    """Удаляет сборки для старых версий исходников"""
+    for path in glob.glob(os.path.join(cache_dir, '*' + BUNDLE_SUFFIX)):
+        if path != current:
+            try:
+                os.remove(path)
+            except OSError:
+                # Сборка ещё открыта другим экземпляром приложения
+                pass
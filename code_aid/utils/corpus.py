@@ -0,0 +1,288 @@
+import glob
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import threading
+from collections.abc import Mapping
+
+from .helpers import load_json_file, save_json_file
+from .records import CodeBlobWriter, blob_path, compact_topics
+
+# Меняется вместе с форматом манифеста
+MANIFEST_VERSION = 2
+
+# Внешние корпуса: JSON Lines, одна запись на строку
+JSONL_SUFFIX = '.jsonl'
+
+
+def module_source_path(module_name):
+    """Путь к исходному файлу модуля без его импорта"""
+    spec = importlib.util.find_spec(module_name)
+    return spec.origin if spec else None
+
+
+def is_data_file(source):
+    """Источник - внешний файл с данными, а не модуль"""
+    return source.endswith(JSONL_SUFFIX)
+
+
+def source_path(source):
+    """Путь к файлу источника: сам файл данных или исходник модуля"""
+    return source if is_data_file(source) else module_source_path(source)
+
+
+def file_hash(path):
+    """SHA-256 содержимого файла"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(source):
+    """(mtime_ns, размер) файла источника или None"""
+    path = source_path(source)
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def import_corpus_module(module_name):
+    """Импортирует модуль с данными: словарь лежит в переменной с именем модуля"""
+    module = importlib.import_module(module_name)
+    return getattr(module, module_name.rsplit('.', 1)[-1])
+
+
+# Без этих полей пример нельзя показать в списке и в редакторе
+REQUIRED_FIELDS = ('title', 'code', 'explanation', 'use_case')
+
+
+def check_entry(doc):
+    """Проверяет строку JSON Lines; возвращает (язык, тема, документ) или бросает ValueError"""
+    if not isinstance(doc, dict):
+        raise ValueError("строка должна быть объектом JSON")
+    lang = doc.pop('lang', None)
+    topic = doc.pop('topic', None)
+    if not isinstance(lang, str) or not isinstance(topic, str):
+        raise ValueError("поля lang и topic должны быть строками")
+    for field in REQUIRED_FIELDS:
+        if not isinstance(doc.get(field), str):
+            raise ValueError(f"нет текстового поля {field}")
+    tags = doc.get('tags', [])
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError("поле tags должно быть списком строк")
+    return lang, topic, doc
+
+
+def iter_jsonl_entries(path):
+    """Читает файл JSON Lines построчно и перебирает (язык, тема, документ).
+
+    Каждая строка - объект с полями lang и topic и полями документа.
+    Ошибочные строки пропускаются: одна плохая строка не должна мешать
+    запуску программы.
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = check_entry(json.loads(line))
+            except (ValueError, RecursionError) as e:
+                print(f"Ошибка в файле {path}, строка {line_number}: {e}")
+                continue
+            yield entry
+
+
+def load_jsonl_language(path, lang, cache_dir=None):
+    """Темы одного языка из файла JSON Lines (остальные строки не хранятся).
+
+    С cache_dir записи становятся SnippetRecord, а код уходит в файл
+    в этом каталоге и читается через mmap.
+    """
+    entries = ((topic, doc) for entry_lang, topic, doc in iter_jsonl_entries(path)
+               if entry_lang == lang)
+    if cache_dir:
+        writer = CodeBlobWriter(blob_path(cache_dir, path, lang, source_fingerprint(path)))
+        return compact_topics(entries, writer)
+
+    topics = {}
+    for topic, doc in entries:
+        topics.setdefault(topic, []).append(doc)
+    return topics
+
+
+def scan_jsonl_topics(path):
+    """Языки, темы и число записей в файле JSON Lines без хранения записей"""
+    languages = {}
+    for lang, topic, _ in iter_jsonl_entries(path):
+        sizes = languages.setdefault(lang, {})
+        sizes[topic] = sizes.get(topic, 0) + 1
+    return {lang: [[topic, size] for topic, size in sizes.items()]
+            for lang, sizes in languages.items()}
+
+
+def find_data_files(directory):
+    """Файлы JSON Lines в каталоге, по алфавиту"""
+    return sorted(glob.glob(os.path.join(directory, '*' + JSONL_SUFFIX)))
+
+
+def load_source(source, lang, cache_dir=None, bundle=None):
+    """Темы языка из источника: файла JSON Lines, сборки или модуля"""
+    if is_data_file(source):
+        return load_jsonl_language(source, lang, cache_dir)
+    if bundle is not None and source in bundle:
+        return bundle.load(source)
+    return import_corpus_module(source)
+
+
+class LazyCorpus(Mapping):
+    """Словарь язык -> {тема: [документы]}, загружающий язык при первом обращении.
+
+    У языка может быть несколько источников: встроенный модуль и файлы
+    JSON Lines; их темы объединяются по порядку источников. Языки, темы
+    и их размеры берутся из небольшого манифеста, поэтому список языков
+    и счётчики доступны без загрузки данных. Запись манифеста устаревает,
+    когда меняется файл источника.
+    """
+
+    def __init__(self, sources, manifest_path=None, data_files=(), cache_dir=None, bundle=None):
+        # язык -> список источников (имена модулей и пути к файлам данных)
+        self.sources = {
+            lang: [source] if isinstance(source, str) else list(source)
+            for lang, source in sources.items()
+        }
+        self.manifest_path = manifest_path
+        # Каталог для кода записей из файлов данных (None - обычные словари)
+        self.cache_dir = cache_dir
+        # Собранные данные модулей (CorpusBundle) - вместо их импорта
+        self.bundle = bundle
+        self._loaded = {}
+        self._lock = threading.RLock()
+        # источник -> {язык: [[тема, размер], ...]}
+        self._manifest = self._read_manifest()
+
+        # Языки файла данных известны только из манифеста или после просмотра файла
+        scanned = False
+        for path in data_files:
+            if path not in self._manifest:
+                self._manifest[path] = scan_jsonl_topics(path)
+                scanned = True
+            for lang in self._manifest[path]:
+                self.sources.setdefault(lang, []).append(path)
+        if scanned:
+            self._write_manifest()
+
+    def _read_manifest(self):
+        if not self.manifest_path:
+            return {}
+        data = load_json_file(self.manifest_path)
+        if data.get('version') != MANIFEST_VERSION:
+            return {}
+
+        manifest = {}
+        for source, entry in data.get('sources', {}).items():
+            if entry.get('fingerprint') == source_fingerprint(source):
+                manifest[source] = entry['languages']
+        return manifest
+
+    def _write_manifest(self):
+        if not self.manifest_path:
+            return
+        data = load_json_file(self.manifest_path)
+        if data.get('version') != MANIFEST_VERSION:
+            data = {'version': MANIFEST_VERSION, 'sources': {}}
+        # Файл общий для нескольких корпусов - обновляем только свои источники
+        for source, languages in self._manifest.items():
+            data['sources'][source] = {
+                'fingerprint': source_fingerprint(source),
+                'languages': languages
+            }
+        save_json_file(self.manifest_path, data)
+
+    def __getitem__(self, lang):
+        loaded = self._loaded.get(lang)
+        if loaded is not None:
+            return loaded
+        if lang not in self.sources:
+            raise KeyError(lang)
+
+        with self._lock:
+            if lang not in self._loaded:
+                self._loaded[lang] = self._load(lang)
+        return self._loaded[lang]
+
+    def _load(self, lang):
+        topics = {}
+        changed = False
+        for source in self.sources[lang]:
+            part = load_source(source, lang, self.cache_dir, self.bundle)
+            for topic, items in part.items():
+                topics.setdefault(topic, []).extend(items)
+
+            sizes = [[topic, len(items)] for topic, items in part.items()]
+            languages = self._manifest.setdefault(source, {})
+            if languages.get(lang) != sizes:
+                languages[lang] = sizes
+                changed = True
+        if changed:
+            self._write_manifest()
+        return topics
+
+    def __contains__(self, lang):
+        return lang in self.sources
+
+    def __iter__(self):
+        return iter(self.sources)
+
+    def __len__(self):
+        return len(self.sources)
+
+    def _topic_sizes(self, lang):
+        # Манифест, если язык ещё не загружен; иначе - сами данные
+        if lang not in self._loaded:
+            parts = [self._manifest.get(source, {}).get(lang) for source in self.sources[lang]]
+            if all(part is not None for part in parts):
+                sizes = {}
+                for part in parts:
+                    for topic, size in part:
+                        sizes[topic] = sizes.get(topic, 0) + size
+                return list(sizes.items())
+        return [(topic, len(items)) for topic, items in self[lang].items()]
+
+    def topics(self, lang):
+        """Названия тем языка"""
+        return [topic for topic, _ in self._topic_sizes(lang)]
+
+    def count(self, scope=None):
+        """Число документов в области: все, язык или (язык, тема)"""
+        if not scope:
+            return sum(self.count((lang,)) for lang in self.sources)
+        if scope[0] not in self.sources:
+            return 0
+        sizes = self._topic_sizes(scope[0])
+        if len(scope) == 1:
+            return sum(size for _, size in sizes)
+        return dict(sizes).get(scope[1], 0)
+
+
+def count_documents(data, scope=None):
+    """Число документов в области для обычного словаря или LazyCorpus"""
+    if isinstance(data, LazyCorpus):
+        return data.count(scope)
+    if not scope:
+        return sum(len(examples) for topics in data.values() for examples in topics.values())
+    topics = data.get(scope[0], {})
+    if len(scope) == 1:
+        return sum(len(examples) for examples in topics.values())
+    return len(topics.get(scope[1], ()))
+
+
+def corpus_scopes(data):
+    """Все области (язык, тема) в порядке корпуса, без загрузки LazyCorpus"""
+    if isinstance(data, LazyCorpus):
+        return [(lang, topic) for lang in data for topic in data.topics(lang)]
+    return [(lang, topic) for lang, topics in data.items() for topic in topics]
@@ -0,0 +1,144 @@
+from array import array
+from collections import Counter
+
+# Поля, из слов которых строится словарь для нечёткого поиска
+FUZZY_FIELDS = ('title', 'tags')
+
+
+def iter_vocabulary_terms(corpus, fields=FUZZY_FIELDS):
+    """Перебирает нормализованные слова из заданных полей корпуса"""
+    positions = [corpus.fields.index(field) for field in fields if field in corpus.fields]
+    for doc_tokens in corpus.tokens:
+        for position in positions:
+            yield from doc_tokens[position]
+
+
+def allowed_distance(word):
+    """Допустимое число опечаток для слова: в коротких словах меньше"""
+    if len(word) <= 3:
+        return 0
+    if len(word) <= 5:
+        return 1
+    return 2
+
+
+def padded_trigrams(word):
+    """Триграммы слова с границами: каждая правка меняет не больше трёх.
+
+    Повторы нумеруются (триграмма, номер повтора), чтобы пересечение
+    множеств считало общие триграммы с кратностью, как требует оценка.
+    """
+    padded = f"$${word}$$"
+    seen = Counter()
+    grams = set()
+    for i in range(len(padded) - 2):
+        gram = padded[i:i + 3]
+        grams.add((gram, seen[gram]))
+        seen[gram] += 1
+    return grams
+
+
+def pattern_masks(word):
+    """Битовые маски позиций символов для edit_distance"""
+    masks = {}
+    for i, char in enumerate(word):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    return masks
+
+
+def edit_distance(word, other, masks=None):
+    """Расстояние Левенштейна, битово-параллельный алгоритм Майерса-Хююрё"""
+    if not word:
+        return len(other)
+    if masks is None:
+        masks = pattern_masks(word)
+
+    size = len(word)
+    full = (1 << size) - 1
+    high = 1 << (size - 1)
+    plus, minus, score = full, 0, size
+
+    for char in other:
+        eq = masks.get(char, 0)
+        xv = eq | minus
+        xh = (((eq & plus) + plus) ^ plus) | eq
+        h_plus = (minus | ~(xh | plus)) & full
+        h_minus = plus & xh
+        if h_plus & high:
+            score += 1
+        elif h_minus & high:
+            score -= 1
+        h_plus = ((h_plus << 1) | 1) & full
+        h_minus = (h_minus << 1) & full
+        plus = (h_minus | ~(xv | h_plus)) & full
+        minus = h_plus & xv
+
+    return score
+
+
+class FuzzyVocabulary:
+    """Словарь для поиска слов с опечатками через триграммный фильтр.
+
+    Слово на расстоянии k от запроса делит с ним не меньше
+    max(длина) + 2 - 3k триграмм (считая повторы), поэтому полное сравнение выполняется
+    только для немногих кандидатов нужной длины.
+    """
+
+    def __init__(self, terms):
+        self.terms = []
+        self.by_length = {}
+        # ((триграмма, номер повтора), длина слова) -> номера слов
+        self.postings = {}
+
+        for term in dict.fromkeys(terms):
+            term_id = len(self.terms)
+            self.terms.append(term)
+            self.by_length.setdefault(len(term), array('I')).append(term_id)
+            for gram in padded_trigrams(term):
+                key = (gram, len(term))
+                posting = self.postings.get(key)
+                if posting is None:
+                    posting = self.postings[key] = array('I')
+                posting.append(term_id)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def lookup(self, word, max_distance=None):
+        """Возвращает [(расстояние, слово)] для слов не дальше max_distance"""
+        if max_distance is None:
+            max_distance = allowed_distance(word)
+
+        grams = padded_trigrams(word)
+        masks = pattern_masks(word)
+        found = []
+
+        for length in range(max(1, len(word) - max_distance), len(word) + max_distance + 1):
+            need = max(length, len(word)) + 2 - 3 * max_distance
+            if need > 0:
+                counts = Counter()
+                for gram in grams:
+                    posting = self.postings.get((gram, length))
+                    if posting:
+                        counts.update(posting)
+                candidates = [term_id for term_id, count in counts.items() if count >= need]
+            else:
+                # Для очень коротких слов фильтр ничего не отсекает
+                candidates = self.by_length.get(length, ())
+
+            for term_id in candidates:
+                term = self.terms[term_id]
+                distance = edit_distance(word, term, masks)
+                if distance <= max_distance:
+                    found.append((distance, term))
+
+        found.sort()
+        return found
+
+    def expand(self, word, max_distance=None):
+        """Возвращает само слово и его близкие варианты из словаря"""
+        variants = [word]
+        for _, term in self.lookup(word, max_distance):
+            if term != word:
+                variants.append(term)
+        return variants
@@ -2,6 +2,8 @@ import json
 import os
 from datetime import datetime
 
+from .tags import snippet_tag_index, invalidate_tag_index, bits_to_ids
+
 def load_json_file(filepath, default=None):
     """Загружает данные из JSON файла"""
     if default is None:
@@ -54,16 +56,30 @@ def count_snippets_by_language(snippets_data):
         stats[lang] = total
     return stats
 
-def filter_snippets_by_tag(snippets_data, tag):
-    """Фильтрует примеры по тегу"""
+def filter_snippets_by_tag(snippets_data, tag, index=None):
+    """Фильтрует примеры по тегу (тег сравнивается точно).
+
+    index - готовый TagIndex по тем же данным, иначе общий индекс корпуса
+    (строится один раз и обновляется при изменении корпуса).
+    """
+    if index is None:
+        index = snippet_tag_index(snippets_data)
+    return _describe_snippets(snippets_data, index, bits_to_ids(index.tag_bits(tag)))
+
+def query_snippets_by_tags(snippets_data, expression, index=None):
+    """Фильтрует примеры по запросу из тегов: 'алгоритмы AND сортировка NOT массивы'"""
+    if index is None:
+        index = snippet_tag_index(snippets_data)
+    return _describe_snippets(snippets_data, index, index.query(expression))
+
+def _describe_snippets(snippets_data, index, doc_ids):
+    """Превращает номера документов индекса в описания примеров"""
     results = []
-    for lang, topics in snippets_data.items():
-        for topic_name, examples in topics.items():
-            for example in examples:
-                if 'tags' in example and tag in example['tags']:
-                    results.append({
-                        'language': lang,
-                        'topic': topic_name,
-                        'title': example['title']
-                    })
+    for doc_id in doc_ids:
+        lang, topic_name, idx = index.keys[doc_id]
+        results.append({
+            'language': lang,
+            'topic': topic_name,
+            'title': snippets_data[lang][topic_name][idx]['title']
+        })
     return results
\ No newline at end of file
@@ -0,0 +1,429 @@
+import hashlib
+import re
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+
+from .helpers import load_json_file, save_json_file
+from .scheduling import BackgroundExecutor
+
+# Ключевые слова для подсветки по языкам
+LANGUAGE_KEYWORDS = {
+    "Python": [
+        'def', 'class', 'if', 'elif', 'else', 'for', 'while',
+        'try', 'except', 'finally', 'with', 'import', 'from',
+        'as', 'return', 'yield', 'async', 'await', 'lambda'
+    ],
+    "Java": [
+        'public', 'private', 'protected', 'class', 'interface',
+        'extends', 'implements', 'void', 'int', 'String', 'boolean',
+        'if', 'else', 'for', 'while', 'try', 'catch', 'finally',
+        'return', 'new', 'static', 'final'
+    ],
+    "C++": [
+        'int', 'float', 'double', 'char', 'void', 'bool',
+        'if', 'else', 'for', 'while', 'do', 'switch', 'case',
+        'class', 'struct', 'public', 'private', 'protected',
+        'virtual', 'override', 'template', 'typename', 'namespace',
+        'return', 'new', 'delete', 'const', 'static'
+    ],
+    "C#": [
+        'public', 'private', 'protected', 'internal', 'class',
+        'interface', 'namespace', 'using', 'var', 'void', 'int',
+        'string', 'bool', 'if', 'else', 'for', 'foreach', 'while',
+        'switch', 'case', 'break', 'continue', 'return', 'new',
+        'this', 'base', 'virtual', 'override', 'async', 'await',
+        'try', 'catch', 'finally', 'throw'
+    ],
+}
+
+# Комментарии в стиле C: строчные и блочные (незакрытый блок - до конца кода)
+SLASH_COMMENTS = r'//[^\n]*|/\*[\s\S]*?(?:\*/|\Z)'
+
+# Строки в кавычках с экранированием; незакрытая строка - до конца строки
+DOUBLE_QUOTED = r'"[^"\\\n]*(?:\\[\s\S][^"\\\n]*)*"?'
+SINGLE_QUOTED = r"'[^'\\\n]*(?:\\[\s\S][^'\\\n]*)*'?"
+TRIPLE_DOUBLE_QUOTED = r'"{3}[\s\S]*?(?:"{3}|\Z)'
+TRIPLE_SINGLE_QUOTED = r"'{3}[\s\S]*?(?:'{3}|\Z)"
+
+
+def number_pattern(separators='_'):
+    """Шаблон числового литерала: шестнадцатеричные, двоичные, с точкой и экспонентой"""
+    digits = rf"\d[\d{separators}]*"
+    return (rf"\b(?:0[xX][0-9a-fA-F{separators}]+|0[bB][01{separators}]+"
+            rf"|{digits}(?:\.(?:{digits})?)?(?:[eE][+-]?\d+)?)[a-zA-Z]*"
+            rf"|(?<![\w.])\.{digits}(?:[eE][+-]?\d+)?[a-zA-Z]*")
+
+
+# Лексика языков. Порядок альтернатив в лексере задаёт приоритет:
+# внутри строки или комментария ключевые слова не подсвечиваются
+LANGUAGE_SYNTAX = {
+    "Python": {
+        'comment': r'#[^\n]*',
+        'string': '|'.join((
+            r'(?:\b[rRbBuUfF]{1,2})?(?:' + TRIPLE_DOUBLE_QUOTED,
+            TRIPLE_SINGLE_QUOTED, DOUBLE_QUOTED, SINGLE_QUOTED + ')')),
+        'number': number_pattern('_'),
+    },
+    "Java": {
+        'comment': SLASH_COMMENTS,
+        'string': '|'.join((TRIPLE_DOUBLE_QUOTED, DOUBLE_QUOTED, SINGLE_QUOTED)),
+        'number': number_pattern('_'),
+    },
+    "C++": {
+        'comment': SLASH_COMMENTS,
+        'string': '|'.join((
+            r'(?:\b(?:u8|[uUL]))?(?:R"(?P<raw_delimiter>[^()\\\s"]{0,16})\('
+            r'[\s\S]*?(?:\)(?P=raw_delimiter)"|\Z)',
+            DOUBLE_QUOTED, SINGLE_QUOTED + ')')),
+        'number': number_pattern("'"),
+    },
+    "C#": {
+        'comment': SLASH_COMMENTS,
+        'string': '|'.join((
+            r'\$*' + TRIPLE_DOUBLE_QUOTED,
+            r'(?:\$@|@\$?)"(?:[^"]|"")*"?',
+            r'\$?' + DOUBLE_QUOTED, SINGLE_QUOTED)),
+        'number': number_pattern('_'),
+    },
+}
+
+# Теги подсветки, которые выставляет лексер
+HIGHLIGHT_TAGS = ('keyword', 'string', 'comment', 'number')
+
+
+class Lexer:
+    """Лексер языка: один комбинированный регулярный шаблон на весь код.
+
+    Комментарии, строки, числа и идентификаторы распознаются за один
+    проход; идентификатор становится ключевым словом по словарю.
+    """
+
+    def __init__(self, keywords, syntax):
+        self.keywords = frozenset(keywords)
+        self.pattern = re.compile('|'.join((
+            f"(?P<comment>{syntax['comment']})",
+            f"(?P<string>{syntax['string']})",
+            f"(?P<number>{syntax['number']})",
+            r'(?P<name>[^\W\d]\w*)',
+        )))
+
+    def iter_tokens(self, code):
+        """Перебирает (тег, начало, конец) в символах; можно остановить в любой момент"""
+        keywords = self.keywords
+        for match in self.pattern.finditer(code):
+            tag = match.lastgroup
+            if tag == 'name':
+                if match.group() not in keywords:
+                    continue
+                tag = 'keyword'
+            yield tag, match.start(), match.end()
+
+
+_LEXERS = {}
+
+
+def get_lexer(lang):
+    """Возвращает (и кэширует) лексер языка или None"""
+    if lang not in _LEXERS:
+        syntax = LANGUAGE_SYNTAX.get(lang)
+        _LEXERS[lang] = Lexer(LANGUAGE_KEYWORDS[lang], syntax) if syntax else None
+    return _LEXERS[lang]
+
+
+def line_offsets(code):
+    """Смещения начала каждой строки кода"""
+    line_starts = [0]
+    line_starts.extend(match.end() for match in re.finditer('\n', code))
+    return line_starts
+
+
+def spans_to_ranges(code, spans, line_starts=None):
+    """Переводит смещения в индексы Tk "строка.столбец", сгруппированные по тегу"""
+    if line_starts is None:
+        line_starts = line_offsets(code)
+
+    ranges = {}
+    for tag, start, end in spans:
+        start_line = bisect_right(line_starts, start) - 1
+        end_line = bisect_right(line_starts, end, start_line) - 1
+        ranges.setdefault(tag, []).extend((
+            f"{start_line + 1}.{start - line_starts[start_line]}",
+            f"{end_line + 1}.{end - line_starts[end_line]}",
+        ))
+    return ranges
+
+
+def apply_ranges(text_widget, ranges):
+    """Выставляет теги пачкой: один вызов tag_add на каждый тег"""
+    for tag, indices in ranges.items():
+        if indices:
+            text_widget.tag_add(tag, *indices)
+
+
+# Меняется вместе с правилами лексера - старый кэш на диске сбрасывается
+LEXER_VERSION = 3
+
+
+def code_digest(code):
+    """Хеш содержимого кода для ключа кэша"""
+    return hashlib.blake2b(code.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class HighlightCache:
+    """LRU-кэш готовых порций подсветки по (язык, хеш кода).
+
+    Повторный показ примера - только пачка tag_add без лексера.
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, lang, code):
+        """Возвращает порции подсветки или None"""
+        key = (lang, code_digest(code))
+        chunks = self.entries.get(key)
+        if chunks is not None:
+            self.entries.move_to_end(key)
+        return chunks
+
+    def put(self, lang, code, chunks):
+        """Запоминает порции, вытесняя давно не использованные"""
+        key = (lang, code_digest(code))
+        self.entries[key] = chunks
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def load(self, filepath):
+        """Загружает кэш с диска (если версия лексера совпадает)"""
+        data = load_json_file(filepath)
+        if data.get('version') != LEXER_VERSION:
+            return
+        for lang, digest, chunks in data.get('entries', [])[-self.capacity:]:
+            self.entries[(lang, digest)] = chunks
+
+    def save(self, filepath):
+        """Сохраняет кэш на диск в порядке использования"""
+        entries = [[lang, digest, chunks] for (lang, digest), chunks in self.entries.items()]
+        return save_json_file(filepath, {'version': LEXER_VERSION, 'entries': entries})
+
+
+# Код длиннее этого числа строк лексируется в фоновом потоке
+LAZY_HIGHLIGHT_LINES = 400
+# Сколько строк вокруг видимой области подсвечивать в первую очередь
+VIEWPORT_MARGIN_LINES = 100
+# Сколько строк лексер обрабатывает за одну порцию
+CHUNK_LINES = 200
+# Сколько секунд главный поток тратит на выставление тегов за один вызов в простое
+APPLY_TIME_BOX = 0.005
+
+
+class HighlightJob:
+    """Подсветка одного фрагмента кода, разбитая на порции по строкам.
+
+    Строки и комментарии могут занимать несколько строк, поэтому лексер
+    всегда идёт от начала кода и останавливается на нужной строке;
+    продолжить можно с того же места. focus - строки видимой области
+    с запасом; поток Tk сдвигает его при прокрутке. Не трогает Tk -
+    может работать в фоновом потоке.
+    """
+
+    def __init__(self, lang, code, lexer):
+        self.lang = lang
+        self.code = code
+        self.line_starts = line_offsets(code)
+        self.tokens = lexer.iter_tokens(code)
+        # Первый прочитанный, но ещё не подсвеченный токен
+        self.pending = None
+        # Строк пролексировано с начала кода
+        self.lines_done = 0
+        # Порции (первая строка, последняя строка, диапазоны по тегам)
+        self.chunks = []
+        self.focus = (1, 1)
+        self.done = False
+
+    @property
+    def line_count(self):
+        return len(self.line_starts)
+
+    def lex(self, line):
+        """Лексирует до строки line (с 1); возвращает (первая, последняя строка, токены)"""
+        target = self.line_starts[line] if line < self.line_count else len(self.code) + 1
+
+        spans = []
+        token = self.pending
+        while True:
+            if token is None:
+                token = next(self.tokens, None)
+                if token is None:
+                    self.done = True
+                    break
+            if token[1] >= target:
+                break
+            spans.append(token)
+            token = None
+        self.pending = token
+
+        piece = (self.lines_done + 1, line, spans)
+        self.lines_done = line
+        return piece
+
+    def to_chunk(self, piece):
+        """Переводит токены в диапазоны Tk и запоминает порцию"""
+        first, last, spans = piece
+        chunk = (first, last, spans_to_ranges(self.code, spans, self.line_starts))
+        self.chunks.append(chunk)
+        return chunk
+
+    def advance(self, line):
+        """Лексирует до строки line (с 1) и возвращает новую порцию"""
+        return self.to_chunk(self.lex(line))
+
+
+def lex_chunks(job, chunk_lines=CHUNK_LINES):
+    """Перебирает порции подсветки до конца кода, начиная с видимой области.
+
+    Если видимая область ниже лексера, строки до неё только лексируются
+    (без перевода в диапазоны), а их порции отдаются после видимой.
+    """
+    skipped = []
+    while True:
+        start, end = job.focus
+        if not job.done and start > job.lines_done + chunk_lines:
+            skipped.append(job.lex(job.lines_done + chunk_lines))
+        elif not job.done and job.lines_done < end:
+            yield job.advance(max(end, job.lines_done + chunk_lines))
+        elif skipped:
+            yield job.to_chunk(skipped.pop(0))
+        elif not job.done:
+            yield job.advance(job.lines_done + chunk_lines)
+        else:
+            return
+
+
+class CodeHighlighter:
+    """Подсветка кода в текстовом виджете.
+
+    Небольшой код подсвечивается сразу. Большой лексируется в фоновом
+    потоке порциями: сначала видимая область с запасом, дальше - вслед
+    за прокруткой и изменением размера (через yscrollcommand) и затем
+    остальное. Главный поток выставляет теги в простое, не дольше
+    APPLY_TIME_BOX за вызов, начиная с видимой области. При выборе
+    другого примера незаконченная работа отбрасывается.
+    """
+
+    def __init__(self, text_widget, cache=None, lazy_lines=LAZY_HIGHLIGHT_LINES,
+                 margin=VIEWPORT_MARGIN_LINES, chunk_lines=CHUNK_LINES,
+                 time_box=APPLY_TIME_BOX):
+        self.widget = text_widget
+        self.cache = cache
+        self.lazy_lines = lazy_lines
+        self.margin = margin
+        self.chunk_lines = chunk_lines
+        self.time_box = time_box
+        self.executor = BackgroundExecutor(text_widget, name="highlight-worker")
+        self.job = None
+        # Порции, полученные от лексера, но ещё не выставленные
+        self.pending = []
+        self._idle_id = None
+
+        # yscrollcommand вызывается при любой смене видимой области
+        self._scroll_command = str(text_widget.cget('yscrollcommand'))
+        text_widget.configure(yscrollcommand=self._on_view_changed)
+
+    def highlight(self, lang, code):
+        """Подсвечивает код, уже вставленный в виджет"""
+        self.cancel()
+        for tag in HIGHLIGHT_TAGS:
+            self.widget.tag_remove(tag, '1.0', 'end')
+
+        chunks = self.cache.get(lang, code) if self.cache is not None else None
+        if chunks is not None:
+            self._queue(chunks)
+            return
+
+        lexer = get_lexer(lang)
+        if lexer is None:
+            return
+
+        job = HighlightJob(lang, code, lexer)
+        if job.line_count <= self.lazy_lines:
+            # Быстрее, чем один кадр: лексируем сразу, без мигания
+            self._queue([job.advance(job.line_count)])
+            self._on_lexed(job)
+        else:
+            job.focus = self.focus_lines()
+            self.job = job
+            self.executor.submit_stream(lex_chunks, self._on_chunk,
+                                        lambda: self._on_lexed(job),
+                                        job, self.chunk_lines)
+
+    def cancel(self):
+        """Отбрасывает незаконченную подсветку"""
+        self.executor.cancel()
+        self.job = None
+        self.pending = []
+        if self._idle_id is not None:
+            self.widget.after_cancel(self._idle_id)
+            self._idle_id = None
+
+    def visible_lines(self):
+        """Первая и последняя видимые строки виджета"""
+        first = self.widget.index("@0,0")
+        last = self.widget.index(f"@0,{self.widget.winfo_height()}")
+        return int(first.split('.')[0]), int(last.split('.')[0])
+
+    def focus_lines(self):
+        """Видимые строки с запасом - их лексер и главный поток обрабатывают первыми"""
+        first, last = self.visible_lines()
+        return max(1, first - self.margin), last + self.margin
+
+    def _queue(self, chunks):
+        self.pending.extend(chunks)
+        if len(self.pending) == 1 and self._idle_id is None:
+            # Одна порция (небольшой код) - выставляем сразу
+            apply_ranges(self.widget, self.pending.pop()[2])
+        else:
+            self._schedule_apply()
+
+    def _on_chunk(self, chunk):
+        self.pending.append(chunk)
+        self._schedule_apply()
+
+    def _on_lexed(self, job):
+        if self.cache is not None:
+            self.cache.put(job.lang, job.code, job.chunks)
+        if self.job is job:
+            self.job = None
+
+    def _on_view_changed(self, first, last):
+        if self._scroll_command:
+            self.widget.tk.call(self._scroll_command, first, last)
+        if self.job is not None:
+            # Лексер в фоновом потоке перейдёт к новой области на следующей порции
+            self.job.focus = self.focus_lines()
+        self._schedule_apply()
+
+    def _schedule_apply(self):
+        if self.pending and self._idle_id is None:
+            self._idle_id = self.widget.after_idle(self._apply_pending)
+
+    def _next_chunk(self, first, last):
+        # Сначала порции, попадающие в видимую область с запасом
+        for i, (start, end, _) in enumerate(self.pending):
+            if start <= last and end >= first:
+                return self.pending.pop(i)
+        return self.pending.pop(0)
+
+    def _apply_pending(self):
+        self._idle_id = None
+        deadline = time.perf_counter() + self.time_box
+        first, last = self.focus_lines()
+        while self.pending and time.perf_counter() < deadline:
+            apply_ranges(self.widget, self._next_chunk(first, last)[2])
+        self._schedule_apply()
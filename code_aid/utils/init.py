@@ -1,4 +1,5 @@
 from .helpers import *
 
 __all__ = ['load_json_file', 'save_json_file', 'format_code_time_complexity', 
-           'get_timestamp', 'count_snippets_by_language', 'filter_snippets_by_tag']
\ No newline at end of file
+           'get_timestamp', 'count_snippets_by_language', 'filter_snippets_by_tag',
+           'query_snippets_by_tags', 'invalidate_tag_index']
\ No newline at end of file
@@ -0,0 +1,109 @@
+import argparse
+import cProfile
+import json
+import platform
+import pstats
+import sys
+import time
+from datetime import datetime
+
+# Только стандартная библиотека: модуль импортируется раньше всего остального
+
+PROFILE_REPORT_FILE = "startup_profile.json"
+# Сколько самых дорогих функций cProfile попадает в отчёт
+CPROFILE_TOP = 40
+
+
+def parse_profile_args(argv):
+    """Разбирает ключи профилирования, остальные аргументы игнорируются"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--profile-startup', nargs='?', const=PROFILE_REPORT_FILE, default=None,
+                        metavar='PATH', help="записать время фаз запуска в JSON")
+    parser.add_argument('--cprofile', action='store_true',
+                        help="добавить в отчёт cProfile по функциям")
+    parser.add_argument('--exit-after-startup', action='store_true',
+                        help="закрыть приложение после записи отчёта")
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def cprofile_rows(profile, limit=CPROFILE_TOP):
+    """Самые дорогие функции по накопленному времени"""
+    stats = pstats.Stats(profile).stats
+    rows = []
+    for (filename, line, function), (_, calls, total, cumulative, _) in stats.items():
+        rows.append({
+            'function': f"{filename}:{line}({function})",
+            'calls': calls,
+            'tottime_ms': round(total * 1000, 3),
+            'cumtime_ms': round(cumulative * 1000, 3)
+        })
+    rows.sort(key=lambda row: row['cumtime_ms'], reverse=True)
+    return rows[:limit]
+
+
+class StartupProfiler:
+    """Отметки времени фаз запуска приложения.
+
+    Отметки ставятся всегда (это дёшево), отчёт пишется только с
+    --profile-startup. Для каждой фазы считается и число модулей,
+    импортированных за неё.
+    """
+
+    def __init__(self, report_path=None, cprofile=False, exit_after=False):
+        self.report_path = report_path
+        self.enabled = report_path is not None
+        self.exit_after = exit_after
+        self.started = time.perf_counter()
+        self.phases = []
+        self._last = self.started
+        self._modules = len(sys.modules)
+        self.profile = cProfile.Profile() if self.enabled and cprofile else None
+        if self.profile is not None:
+            self.profile.enable()
+
+    @classmethod
+    def from_argv(cls, argv=None):
+        """Профилировщик по ключам командной строки"""
+        args = parse_profile_args(sys.argv[1:] if argv is None else argv)
+        return cls(args.profile_startup, args.cprofile, args.exit_after_startup)
+
+    def mark(self, phase):
+        """Завершает фазу: время с прошлой отметки"""
+        now = time.perf_counter()
+        modules = len(sys.modules)
+        self.phases.append({
+            'phase': phase,
+            'ms': round((now - self._last) * 1000, 3),
+            'new_modules': modules - self._modules
+        })
+        self._last = now
+        self._modules = modules
+
+    def report(self):
+        """Отчёт: фазы по порядку, общее время и (если включён) cProfile"""
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'argv': sys.argv,
+            'total_ms': round((self._last - self.started) * 1000, 3),
+            'phases': self.phases
+        }
+        if self.profile is not None:
+            report['cprofile'] = cprofile_rows(self.profile)
+        return report
+
+    def finish(self):
+        """Останавливает cProfile и пишет отчёт; возвращает путь к нему"""
+        if not self.enabled:
+            return None
+        if self.profile is not None:
+            self.profile.disable()
+        try:
+            with open(self.report_path, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"Ошибка сохранения файла {self.report_path}: {e}")
+            return None
+        return self.report_path
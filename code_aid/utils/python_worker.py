@@ -0,0 +1,155 @@
+"""Рабочий интерпретатор для пула PythonWorkerPool.
+
+Запускается отдельным процессом и заранее импортирует модули, которые
+часто нужны примерам. Читает из stdin запросы JSON Lines {"code": ...},
+пишет в stdout события {"stream": ..., "text": ...} и {"exit": код}.
+Там, где есть fork, каждый запуск идёт в дочернем процессе, и состояние
+рабочего процесса между запусками не меняется. Без fork код выполняется
+в самом процессе, и пул заменяет его после каждого запуска.
+
+Дескрипторы 1 и 2 примера - каналы, которые рабочий процесс пересылает
+событиями, поэтому sys.stdout.buffer, os.system и subprocess пишут
+туда же, куда и у отдельного процесса.
+"""
+import builtins
+import codecs
+import json
+import os
+import sys
+import threading
+import traceback
+
+# Импортируются заранее, чтобы не тратить на них время при запуске примера
+import bisect
+import collections
+import dataclasses
+import functools
+import heapq
+import itertools
+import math
+import operator
+import random
+import re
+import string
+import time
+import typing
+
+SNIPPET_FILENAME = '<snippet>'
+
+_send_lock = threading.Lock()
+
+
+def send(channel, message):
+    with _send_lock:
+        channel.write(json.dumps(message, ensure_ascii=False) + '\n')
+        channel.flush()
+
+
+def forward(fd, name, channel):
+    """Пересылает вывод из канала событиями, пока все его писатели не закроют его"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    with open(fd, 'rb', buffering=0) as pipe:
+        while True:
+            data = pipe.read(4096)
+            if not data:
+                break
+            text = decoder.decode(data)
+            if text:
+                send(channel, {'stream': name, 'text': text.replace('\r\n', '\n')})
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        send(channel, {'stream': name, 'text': tail})
+
+
+def open_output_pipes():
+    """Каналы для дескрипторов 1 и 2: (концы для чтения, концы для записи)"""
+    pipes = [os.pipe() for _ in range(2)]
+    return [pipe[0] for pipe in pipes], [pipe[1] for pipe in pipes]
+
+
+def start_forwarding(readers, channel):
+    """Потоки, пересылающие вывод stdout и stderr примера"""
+    threads = []
+    for read_fd, name in zip(readers, ('stdout', 'stderr')):
+        thread = threading.Thread(target=forward, args=(read_fd, name, channel),
+                                  name=f"worker-{name}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+def attach_output(writers):
+    """Ставит концы каналов на место дескрипторов 1 и 2"""
+    for fd, write_fd in zip((1, 2), writers):
+        os.dup2(write_fd, fd)
+        os.close(write_fd)
+
+
+def run_code(code):
+    """Выполняет код как __main__; возвращает код завершения"""
+    # Стандартные потоки интерпретатора пишут в дескрипторы 1 и 2
+    sys.stdout = sys.__stdout__
+    sys.stderr = sys.__stderr__
+    # Дескриптор 0 - /dev/null: input() получает EOF, как у процесса без stdin
+    sys.stdin = sys.__stdin__
+    sys.argv = [SNIPPET_FILENAME]
+    namespace = {'__name__': '__main__', '__builtins__': builtins}
+
+    try:
+        exec(compile(code, SNIPPET_FILENAME, 'exec'), namespace)
+        return 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except BaseException:
+        # Кадры самого рабочего процесса в трассировке не нужны
+        exc_type, exc, tb = sys.exc_info()
+        traceback.print_exception(exc_type, exc, tb.tb_next)
+        return 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+
+def serve():
+    # Протокол идёт по копиям stdin и stdout; сами дескрипторы 0-2
+    # достаются примерам, а между запусками смотрят в никуда
+    channel = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    requests = os.fdopen(os.dup(0), 'r', encoding='utf-8')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    send(channel, {'ready': True})
+
+    for line in requests:
+        code = json.loads(line)['code']
+        readers, writers = open_output_pipes()
+        if hasattr(os, 'fork'):
+            pid = os.fork()
+            if pid == 0:
+                for read_fd in readers:
+                    os.close(read_fd)
+                attach_output(writers)
+                os._exit(run_code(code) & 0xFF)
+            # Потоки пересылки - только после fork, в ребёнке их быть не должно
+            for write_fd in writers:
+                os.close(write_fd)
+            threads = start_forwarding(readers, channel)
+            _, wait_status = os.waitpid(pid, 0)
+            status = os.waitstatus_to_exitcode(wait_status)
+        else:
+            threads = start_forwarding(readers, channel)
+            attach_output(writers)
+            status = run_code(code)
+            # Закрываем последние концы для записи - пересылка дочитает вывод
+            for fd in (1, 2):
+                os.dup2(devnull, fd)
+        for thread in threads:
+            thread.join()
+        send(channel, {'exit': status})
+
+
+if __name__ == '__main__':
+    serve()
@@ -0,0 +1,131 @@
+import heapq
+import math
+from array import array
+
+from .textnorm import tokenize
+
+# Вес совпадения в каждом поле: заголовок важнее кода
+DEFAULT_FIELD_WEIGHTS = {
+    'title': 3.0,
+    'tags': 2.5,
+    'explanation': 1.5,
+    'use_case': 1.0,
+    'code': 0.5,
+}
+
+# Веса полей вопросов разогрева
+WARMUP_FIELD_WEIGHTS = {
+    'question': 3.0,
+    'options': 1.5,
+    'explanation': 1.0,
+}
+
+
+def merge_weights(weights=None, default_weights=DEFAULT_FIELD_WEIGHTS):
+    """Веса полей по умолчанию с пользовательскими поправками"""
+    merged = dict(default_weights)
+    if weights:
+        merged.update(weights)
+    return merged
+
+
+class BM25Ranker:
+    """Ранжирование BM25F с весами полей по заранее посчитанной статистике.
+
+    Строится по NormalizedCorpus; номера документов - номера в корпусе.
+    """
+
+    def __init__(self, corpus, weights=None, k1=1.2, b=0.75,
+                 default_weights=DEFAULT_FIELD_WEIGHTS):
+        self.weights = merge_weights(weights, default_weights)
+        self.fields = tuple(field for field in self.weights if field in corpus.fields)
+        self.k1 = k1
+        self.b = b
+
+        # term -> {doc_id: (tf по каждому полю)}
+        self.postings = {}
+        self.field_lengths = [array('I') for _ in self.fields]
+        self.doc_count = len(corpus)
+        positions = [corpus.fields.index(field) for field in self.fields]
+
+        for doc_id, doc_tokens in enumerate(corpus.tokens):
+            counts = {}
+            for field_no, position in enumerate(positions):
+                tokens = doc_tokens[position]
+                self.field_lengths[field_no].append(len(tokens))
+                for token in tokens:
+                    tfs = counts.get(token)
+                    if tfs is None:
+                        tfs = counts[token] = [0] * len(self.fields)
+                    tfs[field_no] += 1
+            for token, tfs in counts.items():
+                self.postings.setdefault(token, {})[doc_id] = tuple(tfs)
+
+        self.avg_lengths = []
+        for lengths in self.field_lengths:
+            average = sum(lengths) / len(lengths) if lengths else 0
+            self.avg_lengths.append(average or 1.0)
+        self.idf = {
+            term: math.log(1 + (self.doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def score_terms(self, terms, candidates):
+        """Считает BM25 для кандидатов; возвращает {doc_id: score}"""
+        candidate_set = candidates if isinstance(candidates, (set, frozenset)) else set(candidates)
+        scores = {}
+        weights = [self.weights[field] for field in self.fields]
+        k1, b = self.k1, self.b
+
+        for term in set(terms):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf[term]
+
+            # Обходим меньшее из двух множеств
+            if len(docs) < len(candidate_set):
+                matched = (doc_id for doc_id in docs if doc_id in candidate_set)
+            else:
+                matched = (doc_id for doc_id in candidate_set if doc_id in docs)
+
+            for doc_id in matched:
+                tf = 0.0
+                for field_no, count in enumerate(docs[doc_id]):
+                    if count:
+                        norm = 1 - b + b * self.field_lengths[field_no][doc_id] / self.avg_lengths[field_no]
+                        tf += weights[field_no] * count / norm
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (k1 + tf)
+
+        return scores
+
+    def match_terms(self, term_groups, start=0, end=None):
+        """Возвращает документы из диапазона, где есть слово из каждой группы"""
+        if end is None:
+            end = self.doc_count
+        matched = None
+
+        for group in term_groups:
+            docs = set()
+            for term in group:
+                docs.update(doc_id for doc_id in self.postings.get(term, ())
+                            if start <= doc_id < end)
+            matched = docs if matched is None else matched & docs
+            if not matched:
+                return []
+
+        return sorted(matched or ())
+
+    def rank(self, query, candidates, limit=100):
+        """Возвращает не более limit лучших кандидатов по убыванию оценки.
+
+        Отбор идёт через кучу, поэтому весь список кандидатов не сортируется.
+        При равной оценке сохраняется исходный порядок документов.
+        """
+        return self.rank_terms(tokenize(query), candidates, limit)
+
+    def rank_terms(self, terms, candidates, limit=100):
+        """То же, что rank, но для уже разобранного списка слов"""
+        scores = self.score_terms(terms, candidates)
+        return heapq.nlargest(limit, candidates,
+                              key=lambda doc_id: (scores.get(doc_id, 0.0), -doc_id))
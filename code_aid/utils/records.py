@@ -0,0 +1,157 @@
+import glob
+import hashlib
+import mmap
+import os
+import sys
+from collections.abc import Mapping
+
+# Поля примера, которые хранятся в слотах записи
+RECORD_FIELDS = ('title', 'explanation', 'use_case', 'complexity', 'tags')
+
+
+class CodeBlob:
+    """Тела кода в одном файле, отображённом в память.
+
+    Запись хранит только смещение и длину; строка декодируется
+    при обращении к ней.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._map = None
+
+    def _open(self):
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            # mmap не умеет отображать пустой файл
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def read(self, offset, length):
+        """Возвращает строку по смещению и длине в байтах"""
+        if self._map is None:
+            self._open()
+        return self._map[offset:offset + length].decode('utf-8')
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._map = None
+
+
+class CodeBlobWriter:
+    """Собирает тела кода в файл для CodeBlob.
+
+    Раскладка файла зависит только от порядка кода, поэтому если файл
+    уже есть, он не перезаписывается - смещения получаются те же.
+    Читать blob можно после finish().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.blob = CodeBlob(path)
+        self.offset = 0
+        self._file = None if os.path.exists(path) else open(path + '.tmp', 'wb')
+
+    def add(self, code):
+        """Добавляет код, возвращает (смещение, длина)"""
+        data = code.encode('utf-8')
+        span = (self.offset, len(data))
+        if self._file is not None:
+            self._file.write(data)
+        self.offset += len(data)
+        return span
+
+    def finish(self):
+        """Дописывает файл"""
+        if self._file is not None:
+            self._file.close()
+            os.replace(self.path + '.tmp', self.path)
+            self._file = None
+        return self.blob
+
+
+def blob_path(cache_dir, source, lang, fingerprint):
+    """Путь к файлу кода для (источник, язык); старые версии удаляются"""
+    os.makedirs(cache_dir, exist_ok=True)
+    prefix = hashlib.blake2b(f"{source}\0{lang}".encode('utf-8'), digest_size=8).hexdigest()
+    version = hashlib.blake2b(repr(fingerprint).encode('utf-8'), digest_size=8).hexdigest()
+    path = os.path.join(cache_dir, f"{prefix}-{version}.blob")
+
+    for stale in glob.glob(os.path.join(cache_dir, f"{prefix}-*.blob")):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                # Файл ещё отображён в память другим процессом
+                pass
+    return path
+
+
+class SnippetRecord(Mapping):
+    """Компактная запись примера вместо словаря.
+
+    Поля лежат в слотах, теги - кортеж интернированных строк, код -
+    в CodeBlob и декодируется только при обращении к snippet['code'].
+    Доступ как к словарю: snippet['title'], 'complexity' in snippet,
+    snippet.get('tags', ()).
+    """
+
+    __slots__ = RECORD_FIELDS + ('_blob', '_code_offset', '_code_length', '_extra')
+
+    def __init__(self, doc, blob, code_span):
+        self.title = doc.get('title')
+        self.explanation = doc.get('explanation')
+        self.use_case = doc.get('use_case')
+        # Оценок сложности немного - хранится одна копия каждой
+        complexity = doc.get('complexity')
+        self.complexity = sys.intern(complexity) if isinstance(complexity, str) else complexity
+        tags = doc.get('tags')
+        self.tags = tuple(sys.intern(tag) for tag in tags) if tags is not None else None
+        self._blob = blob
+        self._code_offset, self._code_length = code_span
+        # Редкие поля, для которых нет слота
+        extra = {key: value for key, value in doc.items()
+                 if key not in RECORD_FIELDS and key != 'code'}
+        self._extra = extra or None
+
+    def __getitem__(self, key):
+        if key == 'code':
+            return self._blob.read(self._code_offset, self._code_length)
+        if key in RECORD_FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        elif self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key == 'code':
+            return True
+        if key in RECORD_FIELDS:
+            return getattr(self, key) is not None
+        return bool(self._extra) and key in self._extra
+
+    def __iter__(self):
+        yield 'code'
+        for field in RECORD_FIELDS:
+            if getattr(self, field) is not None:
+                yield field
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"SnippetRecord({self.title!r})"
+
+
+def compact_topics(entries, blob_writer):
+    """Собирает {тема: [SnippetRecord]} из (тема, документ); код уходит в blob"""
+    topics = {}
+    for topic, doc in entries:
+        span = blob_writer.add(doc.get('code', ''))
+        topics.setdefault(topic, []).append(SnippetRecord(doc, blob_writer.blob, span))
+    blob_writer.finish()
+    return topics
@@ -0,0 +1,177 @@
+import hashlib
+import re
+import time
+from collections import OrderedDict
+
+from .helpers import load_json_file, save_json_file
+
+# Меняется вместе с форматом файла кеша
+RUN_CACHE_VERSION = 1
+# Сколько результатов хранить
+RUN_CACHE_CAPACITY = 200
+# Общий размер вывода всех результатов (символов)
+RUN_CACHE_MAX_SIZE = 2 * 1024 * 1024
+# Результаты с большим выводом не кешируются
+MAX_CACHED_OUTPUT = 64 * 1024
+
+# Признаки кода, который может выводить разное при каждом запуске:
+# случайные числа, время, ввод, окружение, потоки, адреса и хеши объектов
+NONDETERMINISTIC_PATTERNS = re.compile(
+    r'\brandom\b|\bRandom\b|\brand\s*\(|\bsrand\s*\(|\bmt19937\b|random_device'
+    r'|\bsecrets\b|\buuid\b|\bUUID\b|\bGuid\b'
+    r'|\btime\b|\bdatetime\b|\bDateTime\b|\bStopwatch\b|\bchrono\b|currentTimeMillis|nanoTime'
+    r'|\bLocalDate|\bInstant\b'
+    r'|\binput\s*\(|\bScanner\b|\bReadLine\s*\(|\bcin\b|\bstdin\b'
+    r'|\bthreading\b|\bThread\b|\bthread\b|\bTask\.|\basyncio\b|\bmultiprocessing\b'
+    r'|\bos\.environ\b|\bgetenv\b|\bEnvironment\.|\bos\.getpid\b|\bsocket\b|\burllib\b|\brequests\b'
+    r'|\bopen\s*\(|\bFile\b|\bfstream\b|\bglob\b|\blistdir\b'
+    r'|\bid\s*\(|\bhash\s*\(|\bGetHashCode\b|\bhashCode\b'
+    # Порядок обхода множества строк в Python зависит от PYTHONHASHSEED
+    r'|\bset\s*\(|\bfrozenset\b')
+
+
+def is_deterministic(code, snippet=None):
+    """Можно ли кешировать результат запуска кода.
+
+    Пример можно явно пометить полем "deterministic": false; иначе
+    код проверяется на очевидные источники недетерминированности.
+    """
+    if snippet is not None and not snippet.get('deterministic', True):
+        return False
+    return not NONDETERMINISTIC_PATTERNS.search(code)
+
+
+def run_key(lang, runtime, code):
+    """Ключ результата: язык, версия интерпретатора/компилятора и хеш кода"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (lang, runtime, code):
+        digest.update(part.encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+
+class RunResultCache:
+    """LRU-кеш результатов запуска детерминированного кода.
+
+    Хранит вывод, код завершения и время исходного запуска. Ограничен
+    и числом записей, и общим размером вывода. Сохраняется на диск
+    в порядке использования.
+    """
+
+    def __init__(self, capacity=RUN_CACHE_CAPACITY, max_size=RUN_CACHE_MAX_SIZE):
+        self.capacity = capacity
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.size = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Возвращает результат {'output', 'returncode', 'elapsed'} или None"""
+        result = self.entries.get(key)
+        if result is not None:
+            self.entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        """Запоминает результат, вытесняя давно не использованные"""
+        size = result_size(result)
+        if size > MAX_CACHED_OUTPUT:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= result_size(old)
+        self.entries[key] = result
+        self.size += size
+        while self.entries and (len(self.entries) > self.capacity or self.size > self.max_size):
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= result_size(evicted)
+
+    def load(self, filepath):
+        """Загружает кеш с диска"""
+        data = load_json_file(filepath)
+        if data.get('version') != RUN_CACHE_VERSION:
+            return
+        for key, result in data.get('entries', []):
+            self.put(key, result)
+
+    def save(self, filepath):
+        """Сохраняет кеш на диск в порядке использования"""
+        entries = [[key, result] for key, result in self.entries.items()]
+        return save_json_file(filepath, {'version': RUN_CACHE_VERSION, 'entries': entries})
+
+
+def result_size(result):
+    return sum(len(text) for _, text in result['output'])
+
+
+class CachedRun:
+    """Готовый результат из кеша; интерфейс как у ProcessRun"""
+
+    compiling = False
+    compile_failed = False
+    stopped = False
+    timed_out = False
+    finished = True
+    timeout = None
+
+    def __init__(self, result):
+        self.returncode = result['returncode']
+        # Время исходного запуска
+        self.elapsed = result['elapsed']
+        self._output = [tuple(item) for item in result['output']]
+
+    def poll(self):
+        output, self._output = self._output, []
+        return output
+
+    def stop(self):
+        pass
+
+
+class RecordedRun:
+    """Запуск, результат которого после успешного завершения попадает в кеш"""
+
+    def __init__(self, run, cache, key):
+        self.run = run
+        self.cache = cache
+        self.key = key
+        self.output = []
+        self.size = 0
+        self.recorded = False
+
+    def __getattr__(self, name):
+        # Состояние запуска берётся у исходного объекта
+        return getattr(self.run, name)
+
+    def poll(self):
+        items = self.run.poll()
+        if self.size <= MAX_CACHED_OUTPUT:
+            for kind, text in items:
+                self.output.append([kind, text])
+                self.size += len(text)
+        if self.run.finished and not self.recorded:
+            self.recorded = True
+            if (self.run.returncode == 0 and not self.run.stopped
+                    and self.size <= MAX_CACHED_OUTPUT):
+                self.cache.put(self.key, {
+                    'output': merge_output(self.output),
+                    'returncode': 0,
+                    'elapsed': round(self.run.elapsed, 3),
+                    'created': time.time()
+                })
+        return items
+
+    def stop(self):
+        self.run.stop()
+
+
+def merge_output(output):
+    """Склеивает соседние куски одного потока"""
+    merged = []
+    for kind, text in output:
+        if merged and merged[-1][0] == kind:
+            merged[-1][1] += text
+        else:
+            merged.append([kind, text])
+    return merged
@@ -0,0 +1,361 @@
+import codecs
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Сколько секунд может работать запущенный пример
+RUN_TIMEOUT = 10
+
+# Сколько секунд stop() ждёт завершения убитого процесса
+STOP_WAIT = 1
+
+# Виды событий запуска
+STDOUT = 'stdout'
+STDERR = 'stderr'
+
+
+def process_group_options():
+    """Параметры Popen: процесс в своей группе, чтобы остановить и его потомков"""
+    if os.name == 'nt':
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+
+def kill_process_group(process):
+    """Немедленно завершает процесс вместе со всей его группой"""
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == 'nt':
+            subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except OSError:
+        pass
+    # Группа могла уже завершиться - добиваем сам процесс
+    try:
+        process.kill()
+    except OSError:
+        pass
+
+
+class ProcessRun:
+    """Запущенный процесс, вывод которого читают фоновые потоки.
+
+    Потоки кладут куски stdout/stderr в очередь по мере поступления;
+    поток Tk периодически забирает их через poll(). stop() завершает
+    всю группу процессов сразу.
+    """
+
+    # Этапа компиляции у простого запуска нет
+    compiling = False
+    compile_failed = False
+
+    def __init__(self, args, cwd=None, env=None, timeout=RUN_TIMEOUT, cleanup=None):
+        self.timeout = timeout
+        self.cleanup = cleanup
+        self.returncode = None
+        self.finished = False
+        self.stopped = False
+        self.timed_out = False
+        self.events = queue.Queue()
+        self.started = time.perf_counter()
+        self.ended = None
+        self.process = subprocess.Popen(
+            args, cwd=cwd, env=env,
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            **process_group_options())
+
+        self._open_streams = 2
+        for stream, kind in ((self.process.stdout, STDOUT), (self.process.stderr, STDERR)):
+            threading.Thread(target=self._read, args=(stream, kind),
+                             name=f"run-{kind}-reader", daemon=True).start()
+
+    def _read(self, stream, kind):
+        # Читаем тем, что уже есть в канале, - без ожидания конца строки
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        while True:
+            data = stream.read1(4096) if hasattr(stream, 'read1') else stream.read(4096)
+            if not data:
+                break
+            text = decoder.decode(data)
+            if text:
+                self.events.put((kind, text.replace('\r\n', '\n')))
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            self.events.put((kind, tail))
+        stream.close()
+        self.events.put((kind, None))
+
+    @property
+    def elapsed(self):
+        """Время выполнения в секундах (до завершения - на текущий момент)"""
+        return (self.ended or time.perf_counter()) - self.started
+
+    def poll(self):
+        """Возвращает накопившийся вывод [(вид, текст)] и проверяет завершение"""
+        items = []
+        while True:
+            try:
+                kind, text = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if text is None:
+                self._open_streams -= 1
+            else:
+                items.append((kind, text))
+
+        if not self.finished:
+            if self.timeout and self.elapsed > self.timeout:
+                self.timed_out = True
+                self.stop()
+            if self._open_streams == 0:
+                self.returncode = self.process.wait()
+                self._finish()
+        return items
+
+    def stop(self):
+        """Останавливает процесс и всех его потомков и сразу убирает за ним.
+
+        После закрытия окна poll() больше не вызывается, поэтому
+        временные файлы удаляются здесь, а не только в _finish.
+        """
+        if not self.finished:
+            self.stopped = True
+            kill_process_group(self.process)
+            try:
+                self.process.wait(timeout=STOP_WAIT)
+            except subprocess.TimeoutExpired:
+                pass
+            self._cleanup()
+
+    def _finish(self):
+        self.ended = time.perf_counter()
+        self.finished = True
+        self._cleanup()
+
+    def _cleanup(self):
+        if self.cleanup:
+            self.cleanup()
+            self.cleanup = None
+
+
+def python_command(path):
+    """Команда запуска файла Python без буферизации вывода"""
+    return [sys.executable, '-u', path]
+
+
+def start_python_run(code, timeout=RUN_TIMEOUT):
+    """Запускает код Python во временном файле; файл удаляется по завершении"""
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False,
+                                     encoding='utf-8') as f:
+        f.write(code)
+        path = f.name
+
+    def cleanup():
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    env = dict(os.environ, PYTHONIOENCODING='utf-8')
+    try:
+        return ProcessRun(python_command(path), env=env, timeout=timeout, cleanup=cleanup)
+    except OSError:
+        cleanup()
+        raise
+
+
+# Сколько рабочих интерпретаторов держать наготове
+POOL_SIZE = 2
+# После скольких запусков рабочий процесс заменяется новым. Без fork код
+# выполняется в самом рабочем процессе и меняет его состояние (модули,
+# builtins), поэтому процесс годится только для одного запуска
+MAX_RUNS_PER_WORKER = 50 if hasattr(os, 'fork') else 1
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python_worker.py')
+
+
+class PythonWorker:
+    """Заранее запущенный интерпретатор, выполняющий код по запросам из канала"""
+
+    def __init__(self):
+        self.runs = 0
+        self.events = queue.Queue()
+        env = dict(os.environ, PYTHONIOENCODING='utf-8')
+        self.process = subprocess.Popen(
+            [sys.executable, '-u', WORKER_SCRIPT], env=env,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            **process_group_options())
+        threading.Thread(target=self._read, name="python-worker-reader", daemon=True).start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if 'exit' in message:
+                self.events.put(('exit', message['exit']))
+            elif 'stream' in message:
+                self.events.put((message['stream'], message['text']))
+        # Процесс завершился (упал или был остановлен)
+        self.events.put(('exit', None))
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def send(self, code):
+        """Передаёт код на выполнение"""
+        self.runs += 1
+        self.process.stdin.write(json.dumps({'code': code}).encode('utf-8') + b'\n')
+        self.process.stdin.flush()
+
+    def kill(self):
+        kill_process_group(self.process)
+
+
+class PooledRun:
+    """Запуск кода в рабочем интерпретаторе пула; интерфейс как у ProcessRun"""
+
+    compiling = False
+    compile_failed = False
+
+    def __init__(self, pool, worker, code, timeout=RUN_TIMEOUT):
+        self.pool = pool
+        self.worker = worker
+        self.timeout = timeout
+        self.returncode = None
+        self.finished = False
+        self.stopped = False
+        self.timed_out = False
+        self.started = time.perf_counter()
+        self.ended = None
+        self._released = False
+        worker.send(code)
+
+    @property
+    def elapsed(self):
+        """Время выполнения в секундах (до завершения - на текущий момент)"""
+        return (self.ended or time.perf_counter()) - self.started
+
+    def poll(self):
+        """Возвращает накопившийся вывод [(вид, текст)] и проверяет завершение"""
+        items = []
+        while not self.finished:
+            try:
+                kind, value = self.worker.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'exit':
+                self._finish(value)
+            else:
+                items.append((kind, value))
+
+        if not self.finished and self.timeout and self.elapsed > self.timeout:
+            self.timed_out = True
+            self.stop()
+        return items
+
+    def stop(self):
+        """Останавливает выполнение; рабочий процесс сразу отдаётся пулу на замену"""
+        if not self.finished:
+            self.stopped = True
+            self.worker.kill()
+            self._release(healthy=False)
+
+    def _finish(self, returncode):
+        self.ended = time.perf_counter()
+        self.finished = True
+        # None - рабочий процесс завершился сам или был остановлен
+        crashed = returncode is None
+        self.returncode = self.worker.process.wait() if crashed else returncode
+        self._release(healthy=not crashed and not self.stopped)
+
+    def _release(self, healthy):
+        if not self._released:
+            self._released = True
+            self.pool.release(self.worker, healthy)
+
+
+class PythonWorkerPool:
+    """Пул заранее запущенных интерпретаторов для быстрого запуска примеров.
+
+    Рабочий процесс возвращается в пул после запуска и заменяется новым
+    после MAX_RUNS_PER_WORKER запусков, падения или остановки. Новые
+    процессы запускаются в фоновом потоке, так что и одноразовый
+    процесс (без fork) к следующему запуску уже готов.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_runs=MAX_RUNS_PER_WORKER):
+        self.size = size
+        # Без fork запуски изолированы только отдельными процессами
+        self.max_runs = max_runs if hasattr(os, 'fork') else 1
+        self.idle = []
+        self.closed = False
+        self._lock = threading.Lock()
+        self._filling = False
+
+    def warm_up(self):
+        """Запускает недостающие рабочие процессы в фоне"""
+        with self._lock:
+            if self._filling or self.closed:
+                return
+            self._filling = True
+        threading.Thread(target=self._fill, name="python-pool-fill", daemon=True).start()
+
+    def _fill(self):
+        try:
+            while True:
+                with self._lock:
+                    if self.closed or len(self.idle) >= self.size:
+                        return
+                worker = PythonWorker()
+                with self._lock:
+                    if self.closed:
+                        worker.kill()
+                        return
+                    self.idle.append(worker)
+        except OSError as e:
+            print(f"Не удалось запустить рабочий интерпретатор: {e}")
+        finally:
+            with self._lock:
+                self._filling = False
+
+    def run(self, code, timeout=RUN_TIMEOUT):
+        """Запускает код в свободном рабочем процессе (или в новом, если свободных нет)"""
+        worker = None
+        with self._lock:
+            while self.idle and worker is None:
+                candidate = self.idle.pop()
+                if candidate.alive:
+                    worker = candidate
+        if worker is None:
+            worker = PythonWorker()
+        self.warm_up()
+        return PooledRun(self, worker, code, timeout)
+
+    def release(self, worker, healthy=True):
+        """Возвращает рабочий процесс после запуска"""
+        with self._lock:
+            if healthy and worker.alive and worker.runs < self.max_runs and not self.closed:
+                self.idle.append(worker)
+                return
+        worker.kill()
+        self.warm_up()
+
+    def close(self):
+        """Останавливает все рабочие процессы"""
+        with self._lock:
+            self.closed = True
+            idle, self.idle = self.idle, []
+        for worker in idle:
+            worker.kill()
@@ -0,0 +1,123 @@
+import threading
+
+
+class WindowClosed(Exception):
+    """Окно уничтожено - результаты фоновых задач отдавать некуда"""
+
+
+class Debouncer:
+    """Откладывает вызов до паузы во вводе, отменяя ранее запланированные"""
+
+    def __init__(self, widget, delay, callback):
+        self.widget = widget
+        self.delay = delay
+        self.callback = callback
+        self._after_id = None
+
+    def trigger(self, *args):
+        """Перезапускает таймер: сработает только последний вызов"""
+        self.cancel()
+        self._after_id = self.widget.after(self.delay, self._fire)
+
+    def cancel(self):
+        """Отменяет запланированный вызов"""
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def flush(self):
+        """Выполняет запланированный вызов немедленно"""
+        self.cancel()
+        self.callback()
+
+    def _fire(self):
+        self._after_id = None
+        self.callback()
+
+
+class BackgroundExecutor:
+    """Выполняет задачи в фоновом потоке и возвращает результат в поток Tk.
+
+    Каждая задача получает номер поколения; результат устаревшей задачи
+    (после неё была отправлена новая) отбрасывается. Ошибка задачи не
+    останавливает поток: она передаётся в on_error (в потоке Tk).
+    """
+
+    def __init__(self, widget, name="background-executor", on_error=None):
+        self.widget = widget
+        self.on_error = on_error
+        self.generation = 0
+        self._pending = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit_stream(self, func, on_item, on_done, *args):
+        """Ставит задачу-генератор: каждый элемент передаётся в on_item сразу.
+
+        Ещё не начатая предыдущая задача заменяется. Генератор прерывается,
+        как только задача устаревает; on_done вызывается без аргументов
+        после последнего элемента.
+        """
+        with self._condition:
+            self.generation += 1
+            self._pending = (self.generation, func, args, on_item, on_done)
+            self._condition.notify()
+            return self.generation
+
+    def cancel(self):
+        """Отменяет ожидающую задачу и делает устаревшей выполняемую"""
+        with self._condition:
+            self.generation += 1
+            self._pending = None
+
+    def is_current(self, generation):
+        """Проверяет, что результат этого поколения ещё актуален"""
+        return generation == self.generation
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                generation, func, args, callback, on_done = self._pending
+                self._pending = None
+
+            if not self.is_current(generation):
+                continue
+
+            try:
+                self._execute(generation, func, args, callback, on_done)
+            except WindowClosed:
+                return
+
+    def _execute(self, generation, func, args, callback, on_done):
+        try:
+            for item in func(*args):
+                if not self.is_current(generation):
+                    return
+                self._post(generation, callback, item)
+        except WindowClosed:
+            raise
+        except Exception as e:
+            # В том числе RecursionError - поток должен пережить любую задачу
+            self._report_error(generation, e)
+        self._post(generation, on_done)
+
+    def _report_error(self, generation, error):
+        message = str(error) or type(error).__name__
+        if self.on_error is None:
+            print(f"Ошибка фоновой задачи: {message}")
+        else:
+            self._post(generation, self.on_error, message)
+
+    def _post(self, generation, callback, *args):
+        try:
+            self.widget.after_idle(self._deliver, generation, callback, *args)
+        except Exception as e:
+            # Окно уже закрыто (RuntimeError или TclError)
+            raise WindowClosed() from e
+
+    def _deliver(self, generation, callback, *args):
+        if self.is_current(generation):
+            callback(*args)
@@ -0,0 +1,103 @@
+from array import array
+from bisect import bisect_left
+
+from .textnorm import fold
+
+# Поля примера, по которым ищется подстрока
+SEARCH_FIELDS = ('title', 'code', 'explanation', 'use_case', 'tags')
+
+# Длина n-граммы в индексе
+NGRAM_SIZE = 3
+
+# Если кандидатов осталось меньше, проверяем их напрямую без пересечений
+DIRECT_CHECK_LIMIT = 64
+
+
+def iter_snippet_documents(snippets_data):
+    """Перебирает примеры как документы индекса: ((язык, тема, номер), пример)"""
+    for lang, topics in snippets_data.items():
+        for topic, examples in topics.items():
+            for idx, snippet in enumerate(examples):
+                yield (lang, topic, idx), snippet
+
+
+def make_ngrams(text, size=NGRAM_SIZE):
+    """Возвращает множество n-грамм строки"""
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class SearchIndex:
+    """Инвертированный триграммный индекс для поиска подстроки по примерам.
+
+    Строится по NormalizedCorpus; номера документов - номера в корпусе.
+    """
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self.keys = corpus.keys
+        self.texts = corpus.texts
+        self.scopes = corpus.scopes
+        self.postings = {}
+
+        for doc_id, text in enumerate(self.texts):
+            for gram in make_ngrams(text):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array('I')
+                posting.append(doc_id)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def scope_range(self, scope=None):
+        """Возвращает диапазон номеров документов для области (язык, тема)"""
+        return self.corpus.scope_range(scope)
+
+    def search(self, query, scope=None, candidates=None):
+        """Ищет подстроку и возвращает номера документов в порядке добавления.
+
+        Если передан candidates (отсортированный результат более короткого
+        запроса), проверяются только они - так уточняется предыдущая выдача.
+        """
+        query = fold(query.strip())
+        start, end = self.scope_range(scope)
+
+        if not query:
+            return list(range(start, end))
+
+        if candidates is not None:
+            lo = bisect_left(candidates, start)
+            candidates = candidates[lo:bisect_left(candidates, end, lo)]
+        elif len(query) < NGRAM_SIZE:
+            # Короткий запрос не раскладывается на n-граммы - проверяем тексты
+            candidates = range(start, end)
+        else:
+            candidates = self._candidates(query, start, end)
+
+        texts = self.texts
+        return [doc_id for doc_id in candidates if query in texts[doc_id]]
+
+    def _candidates(self, query, start, end):
+        """Пересекает списки вхождений n-грамм запроса, начиная с самых коротких"""
+        postings = []
+        for gram in make_ngrams(query):
+            posting = self.postings.get(gram)
+            if posting is None:
+                return []
+            lo = bisect_left(posting, start)
+            hi = bisect_left(posting, end, lo)
+            if lo == hi:
+                return []
+            postings.append((hi - lo, posting, lo, hi))
+
+        postings.sort(key=lambda item: item[0])
+        _, posting, lo, hi = postings[0]
+        candidates = set(posting[lo:hi])
+
+        for size, posting, lo, hi in postings[1:]:
+            # Пересекать длинные списки дороже, чем проверить кандидатов напрямую
+            if len(candidates) <= DIRECT_CHECK_LIMIT or size > 4 * len(candidates):
+                break
+            candidates.intersection_update(posting[lo:hi])
+
+        return sorted(candidates)
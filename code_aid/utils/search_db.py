@@ -0,0 +1,231 @@
+import os
+import sqlite3
+import threading
+
+from .textnorm import fold, field_text
+from .ranking import DEFAULT_FIELD_WEIGHTS
+from .corpus import source_path, file_hash
+
+# Поля в порядке колонок таблицы FTS (порядок важен для весов bm25)
+FTS_FIELDS = ('title', 'tags', 'explanation', 'use_case', 'code')
+
+# Больше кандидатов не передаём в IN (...) - проще повторить запрос целиком
+MAX_CANDIDATES = 900
+
+# Меняется вместе со схемой - база со старой схемой строится заново
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (source, lang)
+);
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    lang TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    idx INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_scope ON documents (lang, topic);
+CREATE VIRTUAL TABLE IF NOT EXISTS snippets_fts USING fts5 (
+    title, tags, explanation, use_case, code,
+    tokenize = 'trigram'
+);
+"""
+
+
+def fts_phrase(query):
+    """Экранирует запрос как фразу FTS5 (поиск подстроки в триграммах)"""
+    return '"' + query.replace('"', '""') + '"'
+
+
+class SearchDatabase:
+    """Поисковый индекс примеров на диске (SQLite FTS5, токенизатор trigram).
+
+    Язык переиндексируется, только когда меняется один из файлов его
+    источников: сначала сравнивается mtime и размер, хеш считается
+    лишь при их изменении.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self.connection:
+            version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self.connection.executescript(
+                    "DROP TABLE IF EXISTS sources; DROP TABLE IF EXISTS documents; "
+                    "DROP TABLE IF EXISTS snippets_fts;")
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @classmethod
+    def open(cls, path):
+        """Открывает базу; возвращает None, если SQLite собран без FTS5"""
+        try:
+            return cls(path)
+        except sqlite3.Error as e:
+            print(f"Поисковая база недоступна ({path}): {e}")
+            return None
+
+    def close(self):
+        """Закрывает соединение с базой"""
+        with self._lock:
+            self.connection.close()
+
+    def sync(self, languages):
+        """Обновляет индекс по списку (язык, источники, загрузчик тем).
+
+        Источники - модули и файлы данных языка. Язык переиндексируется
+        целиком, если изменился, появился или пропал хотя бы один его
+        источник; загрузчик вызывается только для таких языков.
+        Возвращает список переиндексированных языков.
+        """
+        updated = []
+        with self._lock:
+            stored = {
+                (source, lang): (mtime_ns, size, digest)
+                for source, lang, mtime_ns, size, digest in
+                self.connection.execute("SELECT source, lang, mtime_ns, size, hash FROM sources")
+            }
+        indexed = {}
+        for source, lang in stored:
+            indexed.setdefault(lang, set()).add(source)
+
+        for lang, sources, load in languages:
+            changed = False
+            fingerprints = {}
+            touched = []
+
+            for source in sources:
+                path = source_path(source)
+                if not path or not os.path.exists(path):
+                    continue
+                stat = os.stat(path)
+                known = stored.get((source, lang))
+                if known and known[:2] == (stat.st_mtime_ns, stat.st_size):
+                    fingerprints[source] = known
+                    continue
+
+                digest = file_hash(path)
+                fingerprints[source] = (stat.st_mtime_ns, stat.st_size, digest)
+                if known and known[2] == digest:
+                    # Файл пересохранён без изменений - обновляем только отметку времени
+                    touched.append(source)
+                else:
+                    changed = True
+
+            # Источник добавлен или удалён
+            if set(fingerprints) != indexed.pop(lang, set()):
+                changed = True
+
+            if changed:
+                self._index_language(lang, load(), fingerprints)
+                updated.append(lang)
+            elif touched:
+                with self._lock, self.connection:
+                    self.connection.executemany(
+                        "UPDATE sources SET mtime_ns = ?, size = ? WHERE source = ? AND lang = ?",
+                        [fingerprints[source][:2] + (source, lang) for source in touched])
+
+        # Языки, которых больше нет в списке
+        for lang in indexed:
+            self._index_language(lang, {}, {})
+
+        return updated
+
+    def _index_language(self, lang, topics, fingerprints):
+        with self._lock, self.connection:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                "DELETE FROM snippets_fts WHERE rowid IN (SELECT id FROM documents WHERE lang = ?)",
+                (lang,))
+            cursor.execute("DELETE FROM documents WHERE lang = ?", (lang,))
+            cursor.execute("DELETE FROM sources WHERE lang = ?", (lang,))
+
+            for topic, examples in topics.items():
+                for idx, snippet in enumerate(examples):
+                    cursor.execute(
+                        "INSERT INTO documents (lang, topic, idx) VALUES (?, ?, ?)",
+                        (lang, topic, idx))
+                    # Текст хранится нормализованным, как и запросы
+                    values = [fold(field_text(snippet, field)) for field in FTS_FIELDS]
+                    cursor.execute(
+                        "INSERT INTO snippets_fts (rowid, title, tags, explanation, use_case, code) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        [cursor.lastrowid] + values)
+
+            cursor.executemany(
+                "INSERT INTO sources (source, lang, mtime_ns, size, hash) VALUES (?, ?, ?, ?, ?)",
+                [(source, lang) + tuple(fingerprint) for source, fingerprint in fingerprints.items()])
+
+    def search(self, query, scope=None, candidates=None, limit=100, weights=None):
+        """Ищет подстроку через FTS5.
+
+        Возвращает (номера всех найденных документов,
+        лучшие limit ключей (язык, тема, номер) по bm25).
+        """
+        rows = self._match(query, scope, candidates, weights)
+        return [row[0] for row in rows], [row[1:] for row in rows[:limit]]
+
+    def search_scopes(self, query, scopes, candidates=None, weights=None):
+        """Ищет сразу во всех областях (язык, тема) одним запросом FTS5.
+
+        Отдельный запрос на каждую область заново сканировал бы весь
+        индекс. Возвращает {область: (номера найденных, ключи по bm25)}
+        только для областей с совпадениями.
+        """
+        wanted = set(scopes)
+        results = {}
+        for rowid, lang, topic, idx in self._match(query, None, candidates, weights):
+            scope = (lang, topic)
+            if scope in wanted:
+                found, ranked = results.setdefault(scope, ([], []))
+                found.append(rowid)
+                ranked.append((lang, topic, idx))
+        return results
+
+    def _match(self, query, scope, candidates, weights):
+        """Строки (номер, язык, тема, индекс) совпадений, лучшие по bm25 первыми"""
+        query = fold(query.strip())
+        conditions = []
+        params = []
+
+        if len(query) >= 3:
+            conditions.append("snippets_fts MATCH ?")
+            params.append(fts_phrase(query))
+        else:
+            # Триграммный индекс не помогает коротким запросам
+            conditions.append("(" + " OR ".join(f"instr({field}, ?)" for field in FTS_FIELDS) + ")")
+            params.extend([query] * len(FTS_FIELDS))
+
+        if scope:
+            conditions.append("documents.lang = ?")
+            params.append(scope[0])
+            if len(scope) > 1:
+                conditions.append("documents.topic = ?")
+                params.append(scope[1])
+
+        if candidates is not None and len(candidates) <= MAX_CANDIDATES:
+            conditions.append(f"snippets_fts.rowid IN ({', '.join('?' * len(candidates))})")
+            params.extend(candidates)
+
+        source = ("FROM snippets_fts JOIN documents ON documents.id = snippets_fts.rowid "
+                  "WHERE " + " AND ".join(conditions))
+
+        if len(query) >= 3:
+            weights = dict(DEFAULT_FIELD_WEIGHTS, **(weights or {}))
+            rank_args = ', '.join(str(float(weights[field])) for field in FTS_FIELDS)
+            order = f"bm25(snippets_fts, {rank_args}), documents.id"
+        else:
+            order = "documents.id"
+
+        with self._lock:
+            return [tuple(row) for row in self.connection.execute(
+                f"SELECT snippets_fts.rowid, documents.lang, documents.topic, documents.idx "
+                f"{source} ORDER BY {order}", params)]
@@ -0,0 +1,185 @@
+import threading
+
+from .search import SearchIndex, iter_snippet_documents
+from .ranking import BM25Ranker, DEFAULT_FIELD_WEIGHTS, WARMUP_FIELD_WEIGHTS, merge_weights
+from .textnorm import NormalizedCorpus, fold, tokenize
+from .fuzzy import FuzzyVocabulary, iter_vocabulary_terms, FUZZY_FIELDS
+from .tags import TagIndex
+from .corpus import count_documents, corpus_scopes
+
+# Режимы поиска
+MODE_SUBSTRING = 'substring'
+MODE_FUZZY = 'fuzzy'
+MODE_TAGS = 'tags'
+
+
+class SearchEngine:
+    """Поиск по словарю язык -> тема -> список документов во всех режимах.
+
+    Поиск подстроки идёт через базу SearchDatabase, если она есть;
+    индексы в памяти строятся только при первом обращении к ним.
+    При базе в память читаются лишь поля словаря опечаток и теги -
+    код и пояснения остаются в отображённом в память файле.
+    Одинаково работает для примеров кода и для вопросов разогрева.
+    """
+
+    def __init__(self, data, weights=None, database=None,
+                 default_weights=DEFAULT_FIELD_WEIGHTS, vocabulary_fields=FUZZY_FIELDS):
+        self.data = data
+        self.weights = weights
+        self.default_weights = default_weights
+        self.vocabulary_fields = vocabulary_fields
+        self.database = database
+        self._lock = threading.Lock()
+        self._corpus = None
+        self._index = None
+        self._ranker = None
+        self._vocabulary = None
+        self._tag_index = None
+
+    @classmethod
+    def for_warmups(cls, warmups_data):
+        """Движок для вопросов разогрева: вопрос, варианты ответов, пояснение"""
+        return cls(warmups_data, default_weights=WARMUP_FIELD_WEIGHTS,
+                   vocabulary_fields=('question', 'options'))
+
+    def _build_memory_indexes(self):
+        """Строит индексы в памяти (один раз, номера документов общие)"""
+        with self._lock:
+            if self._corpus is not None:
+                return
+            # Тексты нормализуются один раз, все индексы читают из корпуса
+            if self.database is None:
+                fields = merge_weights(self.weights, self.default_weights)
+            else:
+                # Подстроку ищет база - нужны только поля словаря опечаток
+                fields = self.vocabulary_fields
+            corpus = NormalizedCorpus(iter_snippet_documents(self.data), fields)
+            self._ranker = BM25Ranker(corpus, self.weights,
+                                      default_weights=self.default_weights)
+            self._vocabulary = FuzzyVocabulary(
+                iter_vocabulary_terms(corpus, self.vocabulary_fields))
+            self._tag_index = TagIndex(corpus.keys, corpus.tags)
+            if self.database is None:
+                self._index = SearchIndex(corpus)
+            self._corpus = corpus
+
+    @property
+    def corpus(self):
+        self._build_memory_indexes()
+        return self._corpus
+
+    @property
+    def index(self):
+        self._build_memory_indexes()
+        return self._index
+
+    @property
+    def ranker(self):
+        self._build_memory_indexes()
+        return self._ranker
+
+    @property
+    def vocabulary(self):
+        self._build_memory_indexes()
+        return self._vocabulary
+
+    @property
+    def tag_index(self):
+        self._build_memory_indexes()
+        return self._tag_index
+
+    def count(self, scope=None):
+        """Число документов в области: все, язык или (язык, тема)"""
+        if self._corpus is not None:
+            start, end = self._corpus.scope_range(scope)
+            return end - start
+        return count_documents(self.data, scope)
+
+    def scopes(self):
+        """Все области (язык, тема) в порядке корпуса"""
+        return corpus_scopes(self.data)
+
+    def search_scopes(self, query, mode, scopes, candidates=None, limit=100):
+        """Ищет по нескольким областям и выдаёт результаты по одной области.
+
+        limit общий на все области. Поиск подстроки в базе - один запрос
+        на все области; остальные режимы ищут в диапазоне каждой области.
+        """
+        if not (mode == MODE_SUBSTRING and self.database is not None and fold(query.strip())):
+            for scope in scopes:
+                batch = self.search(query, mode, scope, candidates, limit)
+                limit -= len(batch['ranked'])
+                yield batch
+                if batch['error']:
+                    return
+            return
+
+        results = self.database.search_scopes(query, scopes, candidates, self.weights)
+        for scope in scopes:
+            found, ranked = results.get(scope, ([], []))
+            ranked = ranked[:max(limit, 0)]
+            limit -= len(ranked)
+            yield {
+                'scope': scope,
+                'found': found,
+                'count': len(found),
+                'ranked': ranked,
+                'error': None
+            }
+
+    def search(self, query, mode, scope, candidates=None, limit=100):
+        """Ищет в области (язык, тема) и ранжирует найденное.
+
+        Возвращает словарь: found - номера документов для уточнения запроса,
+        count - сколько найдено, ranked - лучшие ключи (язык, тема, номер).
+        """
+        batch = {
+            'scope': scope,
+            'found': [],
+            'count': 0,
+            'ranked': [],
+            'error': None
+        }
+        query = fold(query.strip())
+
+        if not query:
+            lang, topic = scope
+            size = len(self.data[lang][topic])
+            batch['count'] = size
+            batch['ranked'] = [(lang, topic, idx) for idx in range(min(size, limit))]
+            return batch
+
+        if mode == MODE_SUBSTRING and self.database is not None:
+            found, ranked = self.database.search(query, scope, candidates, limit, self.weights)
+            batch['found'] = found
+            batch['count'] = len(found)
+            batch['ranked'] = ranked
+            return batch
+
+        corpus = self.corpus
+        start, end = corpus.scope_range(scope)
+
+        if mode == MODE_TAGS:
+            # Булев запрос по тегам вычисляется на битовых множествах
+            try:
+                found = self.tag_index.query(query, start, end)
+            except ValueError as e:
+                batch['error'] = str(e)
+                return batch
+            ranked = found[:limit]
+        elif mode == MODE_FUZZY:
+            # Каждое слово запроса заменяется близкими вариантами из словаря
+            term_groups = [self.vocabulary.expand(word) for word in tokenize(query)]
+            found = self.ranker.match_terms(term_groups, start, end)
+            terms = [term for group in term_groups for term in group]
+            ranked = self.ranker.rank_terms(terms, found, limit)
+        else:
+            # Индекс проверяет только документы-кандидаты из выбранной области
+            found = self.index.search(query, scope, candidates)
+            ranked = self.ranker.rank(query, found, limit)
+
+        batch['found'] = found
+        batch['count'] = len(found)
+        batch['ranked'] = [corpus.keys[doc_id] for doc_id in ranked]
+        return batch
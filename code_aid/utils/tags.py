@@ -0,0 +1,219 @@
+import re
+import threading
+from collections import OrderedDict
+
+from .search import iter_snippet_documents
+from .textnorm import NormalizedCorpus, fold
+
+# Операторы запроса по тегам (регистр не важен)
+TAG_OPERATORS = {
+    'and': 'AND', 'и': 'AND',
+    'or': 'OR', 'или': 'OR',
+    'not': 'NOT', 'не': 'NOT',
+}
+
+TAG_QUERY_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+
+# Для скольких корпусов помнить индекс тегов
+MAX_CACHED_TAG_INDEXES = 4
+
+
+def ids_to_bits(doc_ids, size):
+    """Собирает битовое множество (int) из номеров документов"""
+    buffer = bytearray((size + 7) // 8)
+    for doc_id in doc_ids:
+        buffer[doc_id >> 3] |= 1 << (doc_id & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def bits_to_ids(bits):
+    """Возвращает номера установленных битов по возрастанию"""
+    doc_ids = []
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for byte_no, byte in enumerate(data):
+        if byte:
+            base = byte_no << 3
+            for bit in range(8):
+                if byte >> bit & 1:
+                    doc_ids.append(base + bit)
+    return doc_ids
+
+
+def tokenize_tag_query(expression):
+    """Разбивает запрос на операторы, скобки и теги.
+
+    Соседние слова без оператора между ними образуют один тег
+    ("структуры данных"); тег можно взять в кавычки.
+    """
+    tokens = []
+    words = []
+
+    def flush_words():
+        if words:
+            tokens.append(('TAG', ' '.join(words)))
+            words.clear()
+
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = TAG_QUERY_TOKEN_RE.match(expression, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Некорректный запрос по тегам: {expression}")
+        position = match.end()
+        opening, closing, quoted, word = match.groups()
+
+        if word is not None and word.lower() not in TAG_OPERATORS:
+            words.append(word)
+            continue
+
+        flush_words()
+        if opening:
+            tokens.append(('(', opening))
+        elif closing:
+            tokens.append((')', closing))
+        elif quoted is not None:
+            tokens.append(('TAG', quoted))
+        else:
+            tokens.append((TAG_OPERATORS[word.lower()], word))
+
+    flush_words()
+    return tokens
+
+
+def normalize_tag(tag):
+    """Тег без учёта регистра и пробелов по краям"""
+    return fold(tag.strip())
+
+
+class TagIndex:
+    """Индекс тег -> битовое множество документов с булевыми запросами.
+
+    keys - ключи документов по порядку, doc_tags - их теги. Теги
+    документов и запросов приводятся через normalize; None - точное
+    сравнение.
+    """
+
+    def __init__(self, keys, doc_tags, normalize=normalize_tag):
+        self.keys = keys
+        self.normalize = normalize
+        postings = {}
+        for doc_id, tags in enumerate(doc_tags):
+            for tag in tags:
+                if normalize is not None:
+                    tag = normalize(tag)
+                postings.setdefault(tag, []).append(doc_id)
+
+        self.size = len(self.keys)
+        self.all_bits = (1 << self.size) - 1
+        self.bits = {tag: ids_to_bits(doc_ids, self.size) for tag, doc_ids in postings.items()}
+
+    def tag_bits(self, tag):
+        """Битовое множество документов с тегом"""
+        if self.normalize is not None:
+            tag = self.normalize(tag)
+        return self.bits.get(tag, 0)
+
+    def evaluate(self, expression):
+        """Вычисляет запрос вида 'алгоритмы AND сортировка NOT массивы'.
+
+        Приоритет: NOT, затем AND, затем OR; 'a NOT b' означает 'a AND NOT b'.
+        """
+        tokens = tokenize_tag_query(expression)
+        if not tokens:
+            return self.all_bits
+
+        position = 0
+
+        def peek():
+            return tokens[position][0] if position < len(tokens) else None
+
+        def take(kind):
+            nonlocal position
+            if peek() != kind:
+                raise ValueError(f"Некорректный запрос по тегам: {expression}")
+            position += 1
+            return tokens[position - 1][1]
+
+        def parse_or():
+            bits = parse_and()
+            while peek() == 'OR':
+                take('OR')
+                bits |= parse_and()
+            return bits
+
+        def parse_and():
+            bits = parse_not()
+            while peek() in ('AND', 'NOT'):
+                if peek() == 'AND':
+                    take('AND')
+                    bits &= parse_not()
+                else:
+                    take('NOT')
+                    bits &= ~parse_not() & self.all_bits
+            return bits
+
+        def parse_not():
+            if peek() == 'NOT':
+                take('NOT')
+                return ~parse_not() & self.all_bits
+            if peek() == '(':
+                take('(')
+                bits = parse_or()
+                take(')')
+                return bits
+            return self.tag_bits(take('TAG'))
+
+        bits = parse_or()
+        if position != len(tokens):
+            raise ValueError(f"Некорректный запрос по тегам: {expression}")
+        return bits
+
+    def query(self, expression, start=0, end=None):
+        """Возвращает номера документов из диапазона, подходящих под запрос"""
+        if end is None:
+            end = self.size
+        scope_bits = ((1 << (end - start)) - 1) << start
+        return bits_to_ids(self.evaluate(expression) & scope_bits)
+
+
+def corpus_shape(snippets_data):
+    """Состав корпуса по темам: меняется при замене, добавлении или удалении списков примеров"""
+    return tuple((lang, topic, id(items), len(items))
+                 for lang in snippets_data
+                 for topic, items in snippets_data[lang].items())
+
+
+_tag_indexes = OrderedDict()
+_tag_indexes_lock = threading.Lock()
+
+
+def snippet_tag_index(snippets_data):
+    """Индекс точных тегов корпуса; строится заново, только если корпус изменился.
+
+    Изменение тегов внутри уже добавленного примера состав не меняет -
+    после такой правки нужен invalidate_tag_index.
+    """
+    shape = corpus_shape(snippets_data)
+    key = id(snippets_data)
+    with _tag_indexes_lock:
+        entry = _tag_indexes.get(key)
+        # Корпус хранится в записи, поэтому его id не может достаться другому
+        if entry is not None and entry[0] is snippets_data and entry[1] == shape:
+            _tag_indexes.move_to_end(key)
+            return entry[2]
+
+    # Текстовые поля не нужны - только ключи и теги
+    corpus = NormalizedCorpus(iter_snippet_documents(snippets_data), fields=())
+    index = TagIndex(corpus.keys, corpus.tags, normalize=None)
+    with _tag_indexes_lock:
+        _tag_indexes[key] = (snippets_data, shape, index)
+        _tag_indexes.move_to_end(key)
+        while len(_tag_indexes) > MAX_CACHED_TAG_INDEXES:
+            _tag_indexes.popitem(last=False)
+    return index
+
+
+def invalidate_tag_index(snippets_data):
+    """Забывает индекс тегов корпуса (после правки тегов примеров)"""
+    with _tag_indexes_lock:
+        _tag_indexes.pop(id(snippets_data), None)
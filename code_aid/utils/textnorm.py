@@ -0,0 +1,73 @@
+import re
+import sys
+
+TOKEN_RE = re.compile(r'\w+')
+
+# ё и е в поиске не различаются
+FOLD_TABLE = str.maketrans({'ё': 'е'})
+
+
+def fold(text):
+    """Приводит текст к виду для сравнения: casefold и ё -> е"""
+    return text.casefold().translate(FOLD_TABLE)
+
+
+def tokenize(text):
+    """Разбивает текст на нормализованные слова без знаков препинания"""
+    return [sys.intern(token) for token in TOKEN_RE.findall(fold(text))]
+
+
+def field_text(doc, field):
+    """Возвращает текст поля документа; списки (теги) склеиваются"""
+    value = doc.get(field, '')
+    if isinstance(value, (list, tuple)):
+        return ' '.join(value)
+    return value
+
+
+class NormalizedCorpus:
+    """Нормализованные тексты документов, вычисленные один раз при загрузке.
+
+    Поиск, ранжирование, словарь опечаток и теги читают отсюда, а не
+    вызывают lower() на исходных строках при каждом запросе. Слова полей
+    уже без знаков препинания; теги хранятся как есть - сравнивать их
+    точно или без учёта регистра решает TagIndex. С пустым fields
+    корпус хранит только ключи, теги и области.
+    """
+
+    def __init__(self, documents, fields):
+        self.fields = tuple(fields)
+        self.keys = []
+        # Все поля документа одной строкой - для поиска подстроки
+        self.texts = []
+        # Кортеж слов для каждого поля
+        self.tokens = []
+        # Теги документа без изменений
+        self.tags = []
+        self.scopes = {}
+
+        for key, doc in documents:
+            doc_id = len(self.keys)
+            self.keys.append(key)
+
+            texts = [fold(field_text(doc, field)) for field in self.fields]
+            self.texts.append('\n'.join(texts))
+            self.tokens.append(tuple(
+                tuple(sys.intern(token) for token in TOKEN_RE.findall(text))
+                for text in texts))
+            self.tags.append(tuple(sys.intern(tag) for tag in doc.get('tags', ())))
+
+            # Документы идут подряд, поэтому каждая область - непрерывный диапазон
+            for depth in range(1, len(key)):
+                scope = key[:depth]
+                start, _ = self.scopes.get(scope, (doc_id, doc_id))
+                self.scopes[scope] = (start, doc_id + 1)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def scope_range(self, scope=None):
+        """Возвращает диапазон номеров документов для области (язык, тема)"""
+        if not scope:
+            return 0, len(self.keys)
+        return self.scopes.get(tuple(scope), (0, 0))
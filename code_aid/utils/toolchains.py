@@ -0,0 +1,485 @@
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from .runner import ProcessRun, RUN_TIMEOUT, STDOUT
+
+# Сколько секунд может идти компиляция (первая сборка dotnet бывает долгой)
+COMPILE_TIMEOUT = 120
+# Сколько собранных примеров хранить в кеше
+MAX_CACHED_BUILDS = 100
+# Файл-отметка законченной сборки в каталоге кеша
+BUILD_MARKER = 'build.ok'
+
+EXE_SUFFIX = '.exe' if os.name == 'nt' else ''
+
+JAVA_PUBLIC_CLASS = re.compile(r'\bpublic\s+(?:final\s+|abstract\s+)*class\s+(\w+)')
+JAVA_CLASS = re.compile(r'\bclass\s+(\w+)')
+JAVA_MAIN = re.compile(r'\bstatic\s+(?:public\s+)?void\s+main\s*\(')
+CPP_MAIN = re.compile(r'\bmain\s*\(')
+CSHARP_MAIN = re.compile(r'\bstatic\s+(?:async\s+)?\w+(?:<\w+>)?\s+Main\s*\(')
+
+
+def find_executable(*names):
+    """Первая найденная в PATH программа из списка"""
+    for name in names:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def find_dotnet():
+    """dotnet из PATH, DOTNET_ROOT или установки в домашнем каталоге"""
+    path = shutil.which('dotnet')
+    if path:
+        return path
+    for root in (os.environ.get('DOTNET_ROOT'), os.path.expanduser('~/.dotnet')):
+        if root:
+            candidate = os.path.join(root, 'dotnet' + EXE_SUFFIX)
+            if os.path.isfile(candidate):
+                return candidate
+    return None
+
+
+class Toolchain:
+    """Компилятор и способ запуска собранной программы для одного языка"""
+
+    name = None
+    source_name = None
+
+    def available(self):
+        return False
+
+    def flags(self):
+        """Всё, что влияет на результат сборки, кроме исходного кода"""
+        return []
+
+    def source_file(self, code):
+        return self.source_name
+
+    def has_entry_point(self, code):
+        return True
+
+    def env(self):
+        """Окружение компилятора и программы (None - текущее)"""
+        return None
+
+    def prepare(self, build_dir, code):
+        """Записывает исходники; возвращает команду компиляции"""
+        raise NotImplementedError
+
+    def run_command(self, build_dir, code):
+        raise NotImplementedError
+
+    def write_source(self, build_dir, code):
+        with open(os.path.join(build_dir, self.source_file(code)), 'w', encoding='utf-8') as f:
+            f.write(code)
+
+
+class JavaToolchain(Toolchain):
+    name = 'java'
+
+    def __init__(self):
+        self.javac = find_executable('javac')
+        self.java = find_executable('java')
+
+    def available(self):
+        return bool(self.javac and self.java)
+
+    def flags(self):
+        return [self.javac, '-encoding', 'UTF-8']
+
+    def source_file(self, code):
+        # Публичный класс должен лежать в файле со своим именем
+        match = JAVA_PUBLIC_CLASS.search(code)
+        return (match.group(1) if match else 'Main') + '.java'
+
+    def has_entry_point(self, code):
+        return bool(JAVA_MAIN.search(code))
+
+    def main_class(self, code):
+        """Класс, объявленный последним перед методом main"""
+        main = JAVA_MAIN.search(code)
+        name = None
+        for match in JAVA_CLASS.finditer(code, 0, main.start() if main else len(code)):
+            name = match.group(1)
+        return name or 'Main'
+
+    def prepare(self, build_dir, code):
+        self.write_source(build_dir, code)
+        return self.flags() + ['-d', 'classes', self.source_file(code)]
+
+    def run_command(self, build_dir, code):
+        return [self.java, '-Dfile.encoding=UTF-8', '-Dstdout.encoding=UTF-8',
+                '-Dstderr.encoding=UTF-8', '-cp', os.path.join(build_dir, 'classes'),
+                self.main_class(code)]
+
+
+class CppToolchain(Toolchain):
+    name = 'cpp'
+    source_name = 'main.cpp'
+
+    def __init__(self):
+        self.compiler = find_executable('g++', 'clang++')
+
+    def available(self):
+        return bool(self.compiler)
+
+    def flags(self):
+        return [self.compiler, '-std=c++17', '-O2', '-pipe']
+
+    def has_entry_point(self, code):
+        return bool(CPP_MAIN.search(code))
+
+    def prepare(self, build_dir, code):
+        self.write_source(build_dir, code)
+        if not self.has_entry_point(code):
+            # Без main нечего линковать - только проверка компиляции
+            return self.flags() + ['-fsyntax-only', self.source_name]
+        return self.flags() + ['-o', 'snippet' + EXE_SUFFIX, self.source_name]
+
+    def run_command(self, build_dir, code):
+        return [os.path.join(build_dir, 'snippet' + EXE_SUFFIX)]
+
+
+CSPROJ_TEMPLATE = """<Project Sdk="Microsoft.NET.Sdk">
+  <PropertyGroup>
+    <OutputType>{output_type}</OutputType>
+    <TargetFramework>{framework}</TargetFramework>
+    <AssemblyName>snippet</AssemblyName>
+    <ImplicitUsings>disable</ImplicitUsings>
+    <Nullable>disable</Nullable>
+    <UseSharedCompilation>false</UseSharedCompilation>
+    <GenerateDocumentationFile>false</GenerateDocumentationFile>
+  </PropertyGroup>
+</Project>
+"""
+
+
+class CSharpToolchain(Toolchain):
+    """C#: dotnet build, если есть .NET SDK, иначе компилятор Mono"""
+
+    name = 'csharp'
+    source_name = 'Program.cs'
+
+    def __init__(self):
+        self.dotnet = find_dotnet()
+        self.mono = find_executable('mono')
+        self.mcs = find_executable('mcs', 'csc') if self.mono else None
+        self._framework = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        return bool(self.dotnet or (self.mono and self.mcs))
+
+    def framework(self):
+        """Целевая платформа по версии SDK, например net8.0"""
+        with self._lock:
+            if self._framework is None:
+                self._framework = self._detect_framework()
+            return self._framework
+
+    def _detect_framework(self):
+        """Запускает dotnet --version (до 30 секунд) - только в фоновом потоке"""
+        try:
+            version = subprocess.run([self.dotnet, '--version'], capture_output=True,
+                                     text=True, timeout=30, env=dotnet_env()).stdout
+            return f"net{int(version.split('.')[0])}.0"
+        except (OSError, ValueError, subprocess.SubprocessError):
+            return 'net8.0'
+
+    def flags(self):
+        if self.dotnet:
+            return [self.dotnet, self.framework(), '-c', 'Release']
+        return [self.mcs, '-optimize+']
+
+    def has_entry_point(self, code):
+        return bool(CSHARP_MAIN.search(code))
+
+    def env(self):
+        return dotnet_env() if self.dotnet else None
+
+    def prepare(self, build_dir, code):
+        self.write_source(build_dir, code)
+        entry = self.has_entry_point(code)
+        if self.dotnet:
+            with open(os.path.join(build_dir, 'snippet.csproj'), 'w', encoding='utf-8') as f:
+                f.write(CSPROJ_TEMPLATE.format(output_type='Exe' if entry else 'Library',
+                                               framework=self.framework()))
+            return [self.dotnet, 'build', '-c', 'Release', '-o', 'out', '--nologo',
+                    '-v', 'quiet', '-nodeReuse:false', '-clp:NoSummary']
+        target = '-target:exe' if entry else '-target:library'
+        return [self.mcs, '-optimize+', target, '-out:snippet.exe', self.source_name]
+
+    def run_command(self, build_dir, code):
+        if self.dotnet:
+            return [self.dotnet, os.path.join(build_dir, 'out', 'snippet.dll')]
+        return [self.mono, os.path.join(build_dir, 'snippet.exe')]
+
+
+def dotnet_env():
+    """Окружение dotnet без телеметрии и фоновых серверов сборки.
+
+    Оставшийся после сборки сервер держал бы открытыми каналы вывода,
+    и компиляция никогда бы не считалась завершённой.
+    """
+    return dict(os.environ,
+                DOTNET_CLI_TELEMETRY_OPTOUT='1',
+                DOTNET_NOLOGO='1',
+                DOTNET_SKIP_FIRST_TIME_EXPERIENCE='1',
+                DOTNET_CLI_USE_MSBUILD_SERVER='0',
+                MSBUILDDISABLENODEREUSE='1')
+
+
+TOOLCHAINS = {
+    "Java": JavaToolchain,
+    "C++": CppToolchain,
+    "C#": CSharpToolchain
+}
+
+# Что нужно установить для запуска языка
+TOOLCHAIN_HINTS = {
+    "Java": "JDK (javac и java)",
+    "C++": "g++ или clang++",
+    "C#": ".NET SDK (dotnet) или Mono"
+}
+
+
+def build_key(toolchain, code):
+    """Ключ сборки: хеш исходного кода и параметров компилятора"""
+    digest = hashlib.sha256()
+    for part in [toolchain.name] + toolchain.flags():
+        digest.update(str(part).encode('utf-8') + b'\0')
+    digest.update(code.encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+class CompileCache:
+    """Каталог собранных примеров, адресуемый хешем исходника и флагов.
+
+    Сборка идёт во временном каталоге и переименовывается в каталог
+    ключа только после успешной компиляции, поэтому в кеше не бывает
+    недособранных программ. Повторный запуск неизменённого примера
+    обходится без компиляции. Инструменты ищутся в фоне (warm_up):
+    проверка dotnet может занять десятки секунд.
+    """
+
+    def __init__(self, cache_dir, max_builds=MAX_CACHED_BUILDS):
+        # Программы могут запускаться из другого каталога
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_builds = max_builds
+        self._toolchains = {}
+        self._probed = set()
+        self._lock = threading.Lock()
+        self._probing = False
+
+    def warm_up(self):
+        """Ищет инструменты всех языков и чистит кеш в фоне"""
+        with self._lock:
+            if self._probing:
+                return
+            self._probing = True
+        threading.Thread(target=self._probe, name="toolchain-probe", daemon=True).start()
+
+    def _probe(self):
+        try:
+            for lang in TOOLCHAINS:
+                try:
+                    toolchain = self.toolchain(lang)
+                    if toolchain is not None:
+                        # Флаги включают версию SDK - её и долго узнавать
+                        toolchain.flags()
+                finally:
+                    # Даже неудачная проверка не должна вечно откладывать запуск
+                    with self._lock:
+                        self._probed.add(lang)
+            self.prune()
+        finally:
+            with self._lock:
+                self._probing = False
+
+    def probed(self, lang):
+        """Готовы ли инструменты языка без долгих проверок в текущем потоке"""
+        with self._lock:
+            return lang not in TOOLCHAINS or lang in self._probed
+
+    def toolchain(self, lang):
+        """Инструменты языка или None, если язык не компилируется или они не установлены"""
+        if lang not in TOOLCHAINS:
+            return None
+        with self._lock:
+            if lang not in self._toolchains:
+                self._toolchains[lang] = TOOLCHAINS[lang]()
+            toolchain = self._toolchains[lang]
+        return toolchain if toolchain.available() else None
+
+    def runtime_id(self, lang):
+        """Строка с компилятором и флагами языка - для ключей кеша результатов"""
+        toolchain = self.toolchain(lang)
+        return ' '.join(str(part) for part in toolchain.flags()) if toolchain else ''
+
+    def build_dir(self, toolchain, code):
+        return os.path.join(self.cache_dir, f"{toolchain.name}-{build_key(toolchain, code)}")
+
+    def is_built(self, build_dir):
+        return os.path.exists(os.path.join(build_dir, BUILD_MARKER))
+
+    def start_run(self, lang, code, timeout=RUN_TIMEOUT):
+        """Компилирует (если сборки нет в кеше) и запускает код"""
+        toolchain = self.toolchain(lang)
+        if toolchain is None:
+            raise OSError(f"Для запуска {lang} нужен {TOOLCHAIN_HINTS.get(lang, 'компилятор')}")
+        return CompiledRun(self, toolchain, code, timeout)
+
+    def commit(self, work_dir, build_dir):
+        """Переносит успешную сборку в кеш"""
+        with open(os.path.join(work_dir, BUILD_MARKER), 'w', encoding='utf-8'):
+            pass
+        # Промежуточные файлы dotnet для запуска не нужны
+        shutil.rmtree(os.path.join(work_dir, 'obj'), ignore_errors=True)
+        try:
+            os.replace(work_dir, build_dir)
+        except OSError:
+            # Ту же сборку уже положил другой запуск
+            shutil.rmtree(work_dir, ignore_errors=True)
+        self.touch(build_dir)
+        self.prune()
+
+    def prepare_build(self, toolchain, code):
+        """Временный каталог с исходниками и команда компиляции в нём"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        work_dir = tempfile.mkdtemp(prefix=f"{toolchain.name}-", suffix='.tmp', dir=self.cache_dir)
+        try:
+            return work_dir, toolchain.prepare(work_dir, code)
+        except OSError:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+
+    def touch(self, build_dir):
+        """Отмечает использование сборки (для вытеснения давно не нужных)"""
+        try:
+            os.utime(build_dir)
+        except OSError:
+            pass
+
+    def prune(self):
+        """Удаляет давно не использованные сборки сверх лимита и брошенные временные каталоги"""
+        try:
+            entries = [entry for entry in os.scandir(self.cache_dir) if entry.is_dir()]
+        except OSError:
+            return
+        # Незаконченная сборка старше времени компиляции уже никому не нужна
+        stale = time.time() - COMPILE_TIMEOUT
+        for entry in entries:
+            if entry.name.endswith('.tmp') and entry.stat().st_mtime < stale:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        entries = [entry for entry in entries if self.is_built(entry.path)]
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in entries[self.max_builds:]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+class CompiledRun:
+    """Компиляция и запуск как одно выполнение; интерфейс как у ProcessRun"""
+
+    def __init__(self, cache, toolchain, code, timeout=RUN_TIMEOUT):
+        self.cache = cache
+        self.toolchain = toolchain
+        self.code = code
+        self.timeout = timeout
+        self.returncode = None
+        self.finished = False
+        self.stopped = False
+        self.timed_out = False
+        self.compiling = False
+        self.compile_failed = False
+        self.started = time.perf_counter()
+        self.ended = None
+        self.env = toolchain.env()
+        self.build_dir = cache.build_dir(toolchain, code)
+        self.work_dir = None
+        self.stage = None
+        self._pending = []
+
+        if cache.is_built(self.build_dir):
+            cache.touch(self.build_dir)
+            self._start_program()
+        else:
+            self._start_compile()
+
+    def _start_compile(self):
+        self.compiling = True
+        self.work_dir, command = self.cache.prepare_build(self.toolchain, self.code)
+        try:
+            self.stage = ProcessRun(command, cwd=self.work_dir, env=self.env,
+                                    timeout=COMPILE_TIMEOUT)
+        except OSError:
+            self._discard()
+            raise
+
+    def _start_program(self):
+        self.compiling = False
+        if not self.toolchain.has_entry_point(self.code):
+            self._pending.append((STDOUT, "Код скомпилирован; точки входа main нет - запускать нечего.\n"))
+            self._finish(0)
+            return
+        self.stage = ProcessRun(self.toolchain.run_command(self.build_dir, self.code),
+                                env=self.env, timeout=self.timeout)
+
+    def _discard(self):
+        if self.work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            self.work_dir = None
+
+    @property
+    def elapsed(self):
+        """Время компиляции и выполнения в секундах"""
+        return (self.ended or time.perf_counter()) - self.started
+
+    def poll(self):
+        """Возвращает накопившийся вывод [(вид, текст)] и переходит между этапами"""
+        items, self._pending = self._pending, []
+        if self.finished:
+            return items
+        items.extend(self.stage.poll())
+        if not self.stage.finished:
+            return items
+
+        if self.stage.stopped:
+            self.stopped = True
+            self.timed_out = self.stage.timed_out
+            # Истечь могло и время компиляции
+            self.timeout = self.stage.timeout
+        if self.compiling:
+            if self.stage.returncode == 0 and not self.stopped:
+                self.cache.commit(self.work_dir, self.build_dir)
+                self.work_dir = None
+                self._start_program()
+                return items + self.poll()
+            self.compile_failed = not self.stopped
+            self._discard()
+        self._finish(self.stage.returncode)
+        return items
+
+    def stop(self):
+        """Останавливает текущий этап и сразу убирает временный каталог сборки.
+
+        После закрытия окна poll() больше не вызывается, поэтому
+        выполнение завершается здесь же.
+        """
+        if not self.finished and self.stage is not None:
+            self.stopped = True
+            self.stage.stop()
+            self._discard()
+            self._finish(self.stage.process.returncode)
+
+    def _finish(self, returncode):
+        self.ended = time.perf_counter()
+        self.returncode = returncode
+        self.finished = True
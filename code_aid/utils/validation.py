@@ -0,0 +1,345 @@
+import argparse
+import hashlib
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .helpers import save_json_file
+from .runner import RUN_TIMEOUT, python_command, process_group_options, kill_process_group
+from .toolchains import COMPILE_TIMEOUT
+
+VALIDATION_REPORT_FILE = "validation_report.json"
+# Сколько последних символов вывода попадает в отчёт
+OUTPUT_TAIL = 2000
+
+# Запускалка, которая порождает пример сама и сообщает его ресурсы.
+# ru_maxrss в Linux переживает fork/exec: у процесса, порождённого прямо
+# из этого интерпретатора, пиковая память не бывает меньше памяти самого
+# интерпретатора. У крошечной запускалки этот "пол" - около мегабайта.
+LAUNCHER_SOURCE = r"""
+#include <errno.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <sys/resource.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+int main(int argc, char **argv) {
+    if (argc < 3) return 127;
+    int report = atoi(argv[1]);
+    pid_t pid = fork();
+    if (pid < 0) return 127;
+    if (pid == 0) {
+        close(report);
+        execvp(argv[2], argv + 2);
+        _exit(127);
+    }
+    int status;
+    struct rusage usage;
+    while (wait4(pid, &status, 0, &usage) < 0) {
+        if (errno != EINTR) return 127;
+    }
+    dprintf(report, "%d %ld %ld %ld\n", status, (long)usage.ru_maxrss,
+            (long)(usage.ru_utime.tv_sec * 1000000L + usage.ru_utime.tv_usec),
+            (long)(usage.ru_stime.tv_sec * 1000000L + usage.ru_stime.tv_usec));
+    close(report);
+    if (WIFEXITED(status)) return WEXITSTATUS(status);
+    return 128 + WTERMSIG(status);
+}
+"""
+
+PASSED = 'passed'
+FAILED = 'failed'
+TIMEOUT = 'timeout'
+SKIPPED = 'skipped'
+
+
+def parse_validate_args(argv):
+    """Разбирает ключи проверки корпуса, остальные аргументы игнорируются"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--validate', action='store_true',
+                        help="запустить все примеры без интерфейса и записать отчёт")
+    parser.add_argument('--report', default=VALIDATION_REPORT_FILE, metavar='PATH',
+                        help="файл отчёта JSON")
+    parser.add_argument('--junit', default=None, metavar='PATH',
+                        help="дополнительно записать отчёт JUnit XML")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help="сколько примеров выполнять одновременно")
+    parser.add_argument('--timeout', type=float, default=RUN_TIMEOUT,
+                        help="сколько секунд может работать один пример")
+    parser.add_argument('--lang', action='append', default=None,
+                        help="проверять только этот язык (можно повторять)")
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+class Measurement:
+    """Итог процесса: код завершения, вывод, время и пиковая память"""
+
+    def __init__(self):
+        self.returncode = None
+        self.timed_out = False
+        self.wall_ms = 0.0
+        # None - не измерено (нет os.wait4 или запускалки)
+        self.cpu_ms = None
+        self.peak_rss_kb = None
+        self.output = ''
+
+
+def build_launcher(compile_cache):
+    """Собирает запускалку компилятором C++ из кеша сборок; None - нельзя"""
+    toolchain = compile_cache.toolchain("C++")
+    if toolchain is None or not hasattr(os, 'wait4'):
+        return None
+    digest = hashlib.sha256((toolchain.compiler + LAUNCHER_SOURCE).encode('utf-8')).hexdigest()
+    path = os.path.join(compile_cache.cache_dir, f"launcher-{digest[:16]}")
+    if os.path.exists(path):
+        return path
+
+    try:
+        os.makedirs(compile_cache.cache_dir, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=compile_cache.cache_dir) as work_dir:
+            source = os.path.join(work_dir, 'launcher.cpp')
+            with open(source, 'w', encoding='utf-8') as f:
+                f.write(LAUNCHER_SOURCE)
+            target = os.path.join(work_dir, 'launcher')
+            subprocess.run([toolchain.compiler, '-O2', '-o', target, source], check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           timeout=COMPILE_TIMEOUT)
+            os.replace(target, path)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"Пиковая память не будет измерена: не удалось собрать запускалку ({e})")
+        return None
+    return path
+
+
+def run_measured(args, cwd=None, env=None, timeout=RUN_TIMEOUT, launcher=None):
+    """Выполняет процесс до конца и замеряет его ресурсы.
+
+    С запускалкой ресурсы (и пиковую память) сообщает она; без неё
+    время CPU берётся из os.wait4, а пиковая память не измеряется.
+    """
+    measurement = Measurement()
+    report_read = report_write = None
+    options = process_group_options()
+    if launcher:
+        report_read, report_write = os.pipe()
+        args = [launcher, str(report_write)] + list(args)
+        options['pass_fds'] = (report_write,)
+
+    started = time.perf_counter()
+    try:
+        process = subprocess.Popen(args, cwd=cwd, env=env, stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   **options)
+    except OSError:
+        if launcher:
+            os.close(report_read)
+        raise
+    finally:
+        if launcher:
+            os.close(report_write)
+
+    def on_timeout():
+        measurement.timed_out = True
+        kill_process_group(process)
+
+    timer = threading.Timer(timeout, on_timeout)
+    timer.daemon = True
+    timer.start()
+    try:
+        # Вывод читается до конца, иначе процесс может встать на полном канале
+        output = process.stdout.read()
+        process.stdout.close()
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(process.pid, 0)
+            # Процесс уже собран - Popen не должен ждать его повторно
+            process.returncode = os.waitstatus_to_exitcode(status)
+            measurement.cpu_ms = round((usage.ru_utime + usage.ru_stime) * 1000, 3)
+        else:
+            process.wait()
+    finally:
+        timer.cancel()
+
+    if launcher:
+        with os.fdopen(report_read, 'rb') as f:
+            report = f.read().split()
+        # Отчёта нет, если запускалку остановили по времени
+        if len(report) == 4:
+            status, rss, user_us, system_us = map(int, report)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            measurement.cpu_ms = round((user_us + system_us) / 1000, 3)
+            # В macOS ru_maxrss в байтах, в Linux - в килобайтах
+            measurement.peak_rss_kb = rss // 1024 if sys.platform == 'darwin' else rss
+
+    measurement.wall_ms = round((time.perf_counter() - started) * 1000, 3)
+    measurement.returncode = process.returncode
+    measurement.output = output.decode('utf-8', errors='replace')[-OUTPUT_TAIL:]
+    return measurement
+
+
+def validate_snippet(lang, code, compile_cache, timeout, launcher=None):
+    """Компилирует (если нужно) и запускает один пример; возвращает поля отчёта.
+
+    Пример работает в своём временном каталоге: файлы, которые он
+    создаёт, не мешают другим примерам и удаляются после него.
+    """
+    with tempfile.TemporaryDirectory(prefix='snippet-') as run_dir:
+        return check_snippet(lang, code, compile_cache, timeout, run_dir, launcher)
+
+
+def check_snippet(lang, code, compile_cache, timeout, run_dir, launcher):
+    result = {'status': PASSED}
+
+    if lang == "Python":
+        path = os.path.join(run_dir, 'snippet.py')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(code)
+        env = dict(os.environ, PYTHONIOENCODING='utf-8')
+        run = run_measured(python_command(path), cwd=run_dir, env=env, timeout=timeout,
+                           launcher=launcher)
+    else:
+        toolchain = compile_cache.toolchain(lang)
+        if toolchain is None:
+            result.update(status=SKIPPED, message=f"нет инструментов для {lang}")
+            return result
+
+        build_dir = compile_cache.build_dir(toolchain, code)
+        result['cached_build'] = compile_cache.is_built(build_dir)
+        if not result['cached_build']:
+            work_dir, command = compile_cache.prepare_build(toolchain, code)
+            build = run_measured(command, cwd=work_dir, env=toolchain.env(),
+                                 timeout=COMPILE_TIMEOUT)
+            result['compile_ms'] = build.wall_ms
+            if build.returncode != 0:
+                shutil.rmtree(work_dir, ignore_errors=True)
+                result.update(status=TIMEOUT if build.timed_out else FAILED, phase='compile',
+                              returncode=build.returncode, output=build.output)
+                return result
+            compile_cache.commit(work_dir, build_dir)
+
+        if not toolchain.has_entry_point(code):
+            result['message'] = "точки входа нет - только компиляция"
+            return result
+        run = run_measured(toolchain.run_command(build_dir, code), cwd=run_dir,
+                           env=toolchain.env(), timeout=timeout, launcher=launcher)
+
+    result.update(phase='run', returncode=run.returncode, wall_ms=run.wall_ms,
+                  cpu_ms=run.cpu_ms)
+    if run.peak_rss_kb is not None:
+        result['peak_rss_kb'] = run.peak_rss_kb
+    if run.timed_out:
+        result['status'] = TIMEOUT
+    elif run.returncode != 0:
+        result['status'] = FAILED
+    if result['status'] != PASSED:
+        result['output'] = run.output
+    return result
+
+
+def validate_corpus(snippets, compile_cache, jobs=None, timeout=RUN_TIMEOUT, languages=None):
+    """Проверяет все примеры корпуса параллельно; возвращает отчёт.
+
+    Каждый пример - отдельный процесс, одновременно их работает не
+    больше jobs (по умолчанию - по числу ядер). Потоки пула только
+    ждут свои процессы.
+    """
+    jobs = max(1, jobs or os.cpu_count() or 1)
+    cases = []
+    for lang in snippets:
+        if languages and lang not in languages:
+            continue
+        for topic, items in snippets[lang].items():
+            for idx, snippet in enumerate(items):
+                cases.append({'lang': lang, 'topic': topic, 'index': idx,
+                              'title': snippet.get('title', ''), 'code': snippet['code']})
+
+    launcher = build_launcher(compile_cache)
+
+    def check(case):
+        try:
+            result = validate_snippet(case['lang'], case['code'], compile_cache, timeout,
+                                      launcher)
+        except OSError as e:
+            result = {'status': FAILED, 'phase': 'start', 'message': str(e)}
+        print(f"[{result['status']}] {case['lang']} / {case['topic']} / {case['title']}", flush=True)
+        return result
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="validate") as executor:
+        results = list(executor.map(check, cases))
+    total_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    summary = {status: 0 for status in (PASSED, FAILED, TIMEOUT, SKIPPED)}
+    entries = []
+    for case, result in zip(cases, results):
+        summary[result['status']] += 1
+        entry = {key: value for key, value in case.items() if key != 'code'}
+        entry.update(result)
+        entries.append(entry)
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'jobs': jobs,
+        'timeout': timeout,
+        'peak_rss_measured': launcher is not None,
+        'total_ms': total_ms,
+        'summary': summary,
+        'results': entries
+    }
+
+
+def junit_xml(report):
+    """Отчёт в формате JUnit: набор тестов на язык, тест на пример"""
+    root = ET.Element('testsuites', name='snippets', tests=str(len(report['results'])),
+                      time=f"{report['total_ms'] / 1000:.3f}")
+    suites = {}
+    for entry in report['results']:
+        suite = suites.get(entry['lang'])
+        if suite is None:
+            suite = suites[entry['lang']] = ET.SubElement(root, 'testsuite', name=entry['lang'])
+        seconds = (entry.get('compile_ms', 0) + entry.get('wall_ms', 0)) / 1000
+        case = ET.SubElement(suite, 'testcase', classname=f"{entry['lang']}.{entry['topic']}",
+                             name=f"{entry['index']}: {entry['title']}", time=f"{seconds:.3f}")
+        status = entry['status']
+        if status == SKIPPED:
+            ET.SubElement(case, 'skipped', message=entry.get('message', ''))
+        elif status != PASSED:
+            failure = ET.SubElement(case, 'failure', type=status,
+                                    message=f"{entry.get('phase', '')}: код {entry.get('returncode')}")
+            failure.text = entry.get('output') or entry.get('message', '')
+
+    for suite in suites.values():
+        cases = suite.findall('testcase')
+        suite.set('tests', str(len(cases)))
+        suite.set('failures', str(sum(1 for case in cases if case.find('failure') is not None)))
+        suite.set('skipped', str(sum(1 for case in cases if case.find('skipped') is not None)))
+    root.set('failures', str(sum(int(suite.get('failures')) for suite in suites.values())))
+    return ET.ElementTree(root)
+
+
+def run_validation(snippets, compile_cache, argv=None):
+    """Точка входа --validate: проверяет корпус, пишет отчёты, возвращает код выхода"""
+    args = parse_validate_args(sys.argv[1:] if argv is None else argv)
+    report = validate_corpus(snippets, compile_cache, args.jobs, args.timeout, args.lang)
+
+    save_json_file(args.report, report)
+    if args.junit:
+        junit_xml(report).write(args.junit, encoding='utf-8', xml_declaration=True)
+
+    summary = report['summary']
+    print(f"Проверено примеров: {len(report['results'])} за {report['total_ms'] / 1000:.1f} с - "
+          f"успешно {summary[PASSED]}, ошибок {summary[FAILED]}, "
+          f"по времени {summary[TIMEOUT]}, пропущено {summary[SKIPPED]}")
+    print(f"Отчёт: {args.report}" + (f", {args.junit}" if args.junit else ""))
+    return 0 if summary[FAILED] == 0 and summary[TIMEOUT] == 0 else 1